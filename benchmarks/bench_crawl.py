@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import html_parsing
+import mock_server
+import parsers
+import records_io
+from session_pool import SessionPool
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.ndjson")
+PAGES = 50
+LATENCY = 0.02  # Secondes
+ERROR_RATE = 0.0
+REPEAT = 3
+WRITE_ROUNDS = 20  # Répétitions des enregistrements pour mesurer l'écriture JSON/CSV
+
+
+def start_mock(fixtures_dir, pages, latency, error_rate):
+    """
+    Démarre le serveur simulé sur un port libre, avec les pages enregistrées si un dossier est fourni.
+    """
+    records = mock_server.load_records(os.path.join(ROOT, mock_server.RECORDS_FILE))
+    fixtures = mock_server.load_fixtures(fixtures_dir) if fixtures_dir else None
+    server = mock_server.create_server(records, 0, latency=latency, error_rate=error_rate, pages=pages,
+                                       fixtures=fixtures)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_crawl(export_details_data, workdir):
+    """
+    Export détaillé complet contre le serveur simulé ; renvoie les métriques de débit et le fichier produit.
+    """
+    export_details_data.json_filename = os.path.join(workdir, "crawl.ndjson")
+    export_details_data.search_sessions = SessionPool(export_details_data.create_search_session,
+                                                      export_details_data.SEARCH_SESSIONS)
+    start = time.monotonic()
+    export_details_data.fetch_all_results(start_page=1)
+    elapsed = time.monotonic() - start
+
+    stage_stats = export_details_data.stage_stats
+    records = sum(1 for _ in records_io.iter_records(export_details_data.json_filename))
+    metrics = {
+        "crawl_seconds": elapsed,
+        "pages_per_second": stage_stats.counts["pages"] / elapsed,
+        "records_per_second": records / elapsed,
+    }
+    for stage in stage_stats.stages:
+        count = stage_stats.counts[stage]
+        metrics[f"stage_ms.{stage}"] = stage_stats.busy[stage] / count * 1000 if count else 0
+    return metrics, export_details_data.json_filename
+
+
+def time_parsers(server):
+    """
+    Temps moyen d'analyse, en millisecondes par page, des pages servies par le serveur simulé.
+    """
+    handler = server.RequestHandlerClass
+    if handler.listing_fixtures:
+        listing_pages = handler.listing_fixtures
+        details_pages = list(handler.details_fixtures.values())
+    else:
+        max_pages = -(-len(handler.records) // mock_server.PAGE_SIZE)
+        listing_pages = [mock_server.render_listing_page(handler.records, page, max_pages) for page in range(1, 21)]
+        details_pages = [mock_server.render_details_page(record) for record in handler.records[:200]]
+
+    metrics = {}
+    for name, function, pages in [
+        ("parse_listing_page", parsers.parse_listing_page, listing_pages),
+        ("extract_most_recent_ap", parsers.extract_most_recent_ap, details_pages),
+        ("extract_additional_parameters", parsers.extract_additional_parameters, details_pages),
+    ]:
+        best = min(timeit.repeat(lambda: [function(html) for html in pages], number=1, repeat=REPEAT))
+        metrics[f"parse_ms.{name}"] = best / len(pages) * 1000
+    return metrics
+
+
+def time_writers(json_filename, workdir):
+    """
+    Débit d'écriture NDJSON et de conversion CSV, en enregistrements et mégaoctets par seconde.
+    """
+    records = list(records_io.iter_records(json_filename)) * WRITE_ROUNDS
+    ndjson_filename = os.path.join(workdir, "write.ndjson")
+    csv_filename = os.path.join(workdir, "write.csv")
+
+    start = time.monotonic()
+    with records_io.NdjsonWriter(ndjson_filename, mode="w") as writer:
+        for record in records:
+            writer.write(record)
+    json_seconds = time.monotonic() - start
+
+    start = time.monotonic()
+    records_io.convert_to_csv(ndjson_filename, csv_filename)
+    csv_seconds = time.monotonic() - start
+
+    megabytes = 1024 ** 2
+    return {
+        "json_records_per_second": len(records) / json_seconds,
+        "json_mb_per_second": os.path.getsize(ndjson_filename) / megabytes / json_seconds,
+        "csv_records_per_second": len(records) / csv_seconds,
+        "csv_mb_per_second": os.path.getsize(csv_filename) / megabytes / csv_seconds,
+    }
+
+
+def peak_rss_mb():
+    """
+    Mémoire résidente maximale du benchmark et de ses processus d'analyse, en mégaoctets.
+    """
+    kilobytes = 1024 if sys.platform == "darwin" else 1  # ru_maxrss is in bytes on macOS
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / kilobytes / 1024,
+        "peak_rss_children_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / kilobytes / 1024,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results_file, run):
+    """
+    Ajoute le résultat au fichier NDJSON et renvoie la dernière exécution précédente avec les mêmes paramètres.
+    """
+    previous = None
+    if os.path.exists(results_file):
+        for entry in records_io.iter_records(results_file):
+            if entry["params"] == run["params"]:
+                previous = entry
+    with records_io.NdjsonWriter(results_file) as writer:
+        writer.write(run)
+    return previous
+
+
+# Main
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne de l'export détaillé contre le serveur simulé.")
+    parser.add_argument("--pages", type=int, default=PAGES, help="pages de résultats servies")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="latence ajoutée à chaque réponse (s)")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="proportion de réponses 503")
+    parser.add_argument("--fixtures", metavar="DOSSIER", help="pages enregistrées par record_fixtures.py")
+    parser.add_argument("--results", default=RESULTS_FILE, help="fichier NDJSON des résultats successifs")
+    args = parser.parse_args()
+
+    server = start_mock(args.fixtures, args.pages, args.latency, args.error_rate)
+    # The export script reads its URLs at import time
+    os.environ["INFOTERRE_URL"] = os.environ["MINERALINFO_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    import export_details_data
+
+    with tempfile.TemporaryDirectory() as workdir:
+        metrics, json_filename = run_crawl(export_details_data, workdir)
+        metrics.update(time_parsers(server))
+        metrics.update(time_writers(json_filename, workdir))
+    metrics.update(peak_rss_mb())
+    server.shutdown()
+
+    run = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "params": {
+            "pages": args.pages, "latency": args.latency, "error_rate": args.error_rate,
+            "fixtures": bool(args.fixtures), "parser": html_parsing.get_backend(),
+        },
+        "metrics": metrics,
+    }
+    previous = save_results(args.results, run)
+
+    print()
+    print(f"Benchmark {run['date']} ({run['commit']}), {json.dumps(run['params'])}")
+    for name, value in metrics.items():
+        line = f"{name:<40} {value:>12.2f}"
+        if previous and previous["metrics"].get(name):
+            change = (value - previous["metrics"][name]) / previous["metrics"][name] * 100
+            line += f"  {change:+.1f}% vs {previous['commit']}"
+        print(line)
+    print(f"Résultats ajoutés à {args.results}.")
@@ -0,0 +1,37 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+
+import parsers
+import mock_server
+
+REPEAT = 5
+PAGES = 20
+
+
+def per_label_scan(rows):
+    return [{label: parsers.extract_field(row, label) for label in parsers.ADDITIONAL_FIELDS} for row in rows]
+
+
+def single_pass(rows):
+    return [parsers.extract_fields(row, parsers.ADDITIONAL_FIELDS) for row in rows]
+
+
+# Main
+if __name__ == "__main__":
+    records = mock_server.load_records(os.path.join(os.path.dirname(parsers.__file__), mock_server.RECORDS_FILE))
+    max_pages = -(-len(records) // mock_server.PAGE_SIZE)
+    rows = []
+    for page_number in range(1, PAGES + 1):
+        soup = BeautifulSoup(mock_server.render_listing_page(records, page_number, max_pages), "html.parser")
+        rows.extend(soup.find_all("tr", id=lambda x: x and x.startswith("results_item_additional_content_")))
+
+    assert per_label_scan(rows) == single_pass(rows), "Les deux méthodes ne donnent pas le même résultat."
+
+    for name, function in [("extract_field x label", per_label_scan), ("extract_fields", single_pass)]:
+        best = min(timeit.repeat(lambda: function(rows), number=1, repeat=REPEAT))
+        print(f"{name:<22} {len(rows)} lignes : {best * 1000:.1f} ms ({best / len(rows) * 1e6:.0f} µs/ligne)")
@@ -0,0 +1,52 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import html_parsing
+import mock_server
+import parsers
+
+REPEAT = 3
+PAGES = 20
+
+
+def parse_all(listing_pages, details_pages):
+    results = [parsers.get_max_pages(html) for html in listing_pages]
+    results += [parsers.parse_listing_page(html) for html in listing_pages]
+    results += [parsers.extract_most_recent_ap(html) for html in details_pages]
+    results += [parsers.extract_additional_parameters(html) for html in details_pages]
+    return results
+
+
+def full_document(make_soup):
+    """
+    Ignore `parse_only` pour analyser le document complet, comme avant l'analyse ciblée.
+    """
+    return lambda html_content, parse_only=None: make_soup(html_content)
+
+
+# Main
+if __name__ == "__main__":
+    records = mock_server.load_records(os.path.join(os.path.dirname(html_parsing.__file__), mock_server.RECORDS_FILE))
+    max_pages = -(-len(records) // mock_server.PAGE_SIZE)
+    listing_pages = [mock_server.render_listing_page(records, page, max_pages) for page in range(1, PAGES + 1)]
+    with_history = [record for record in records if record.get("Date début validité")]
+    details_pages = [mock_server.render_details_page(record) for record in with_history + records[:PAGES * 10]]
+
+    targeted = html_parsing.make_soup
+    html_parsing.set_backend("html.parser")
+    html_parsing.make_soup = full_document(targeted)
+    reference = parse_all(listing_pages, details_pages)
+
+    for name in html_parsing.BACKENDS:
+        if not html_parsing.is_available(name):
+            print(f"{name:<12} non installé")
+            continue
+        html_parsing.set_backend(name)
+        for mode, make_soup in [("complet", full_document(targeted)), ("ciblé", targeted)]:
+            html_parsing.make_soup = make_soup
+            assert parse_all(listing_pages, details_pages) == reference, f"{name} ({mode}) diffère de html.parser."
+            best = min(timeit.repeat(lambda: parse_all(listing_pages, details_pages), number=1, repeat=REPEAT))
+            print(f"{name:<12} {mode:<8} {best * 1000:.1f} ms")
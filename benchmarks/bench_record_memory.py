@@ -0,0 +1,55 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import records_io
+from compact_records import CompactRecord
+from merge_data import is_export_file
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+INPUT_FOLDER = os.path.join(ROOT, "output")
+
+
+def load(file_paths, make_record):
+    """
+    Charge tous les enregistrements en mémoire ; renvoie la liste, la mémoire allouée (octets) et la durée.
+    """
+    tracemalloc.start()
+    start = time.monotonic()
+    records = [make_record(record) for file_path in file_paths for record in records_io.iter_records(file_path)]
+    elapsed = time.monotonic() - start
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, allocated, elapsed
+
+
+# Main
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mémoire des enregistrements en dict et en CompactRecord.")
+    parser.add_argument("folder", nargs="?", default=INPUT_FOLDER, help="dossier des exports JSON/NDJSON")
+    args = parser.parse_args()
+
+    file_paths = sorted(path for path in glob.glob(os.path.join(args.folder, "*")) if is_export_file(path))
+    if not file_paths:
+        sys.exit(f"Aucun export JSON/NDJSON dans {args.folder}.")
+
+    dicts, dict_bytes, dict_seconds = load(file_paths, lambda record: record)
+    compact, compact_bytes, compact_seconds = load(file_paths, CompactRecord)
+
+    # Same JSON layout (values and key order) as the original records
+    for record, compact_record in zip(dicts, compact):
+        assert json.dumps(compact_record.to_dict(), ensure_ascii=False) == json.dumps(record, ensure_ascii=False), \
+            f"Enregistrement {record.get('Identifiant')} différent après conversion."
+
+    megabytes = 1024 ** 2
+    print(f"{len(dicts)} enregistrements dans {len(file_paths)} fichiers de {args.folder}")
+    for name, allocated, elapsed in [("dict", dict_bytes, dict_seconds), ("CompactRecord", compact_bytes, compact_seconds)]:
+        print(f"{name:<14} {allocated / megabytes:8.1f} Mo  {allocated / len(dicts):6.0f} octets/enregistrement  "
+              f"chargement {elapsed:.2f} s")
+    print(f"Mémoire divisée par {dict_bytes / compact_bytes:.1f}.")
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import export_details_data
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = 5  # Pages de résultats enregistrées, à partir de START_PAGE
+
+
+def save(filename, html_content):
+    with open(os.path.join(FIXTURES_DIR, filename), "w", encoding="utf-8") as html_file:
+        html_file.write(html_content)
+
+
+# Main
+if __name__ == "__main__":
+    # Enregistre des pages réelles (pagine.htm et leurs fiches) pour les benchmarks hors ligne :
+    # le serveur simulé les sert à la place des pages générées (MOCK_FIXTURES ou bench_crawl.py --fixtures)
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    headers = export_details_data.create_search_session()
+    start_page = int(sys.argv[1]) if len(sys.argv) > 1 else export_details_data.START_PAGE
+    for index, page_number in enumerate(range(start_page, start_page + PAGES), start=1):
+        html_content = export_details_data.fetch_page_content(page_number, headers)
+        if not html_content:
+            continue
+        save(f"pagine_{index:04d}.html", html_content)
+        _, carmat_ids = export_details_data.parse_listing_page(html_content)
+        for carmat_id in carmat_ids:
+            details_html = export_details_data.fetch_additional_details(carmat_id)
+            if details_html:
+                save(f"carmat_{carmat_id}.html", details_html)
+    print(f"Pages enregistrées dans {FIXTURES_DIR}.")
@@ -0,0 +1,130 @@
+import glob
+import json
+import os
+
+
+class CheckpointJournal:
+    """
+    Journal de progression d'un export, en JSON Lines, écrit à côté du fichier de sortie.
+
+    Chaque ligne est écrite et synchronisée sur disque après les données qu'elle décrit :
+    une page n'est considérée comme terminée que si sa ligne est complète. Une dernière ligne
+    tronquée par un arrêt brutal est ignorée à la relecture.
+
+    Une page dont la récupération a échoué est validée avec "failed", et les identifiants dont
+    la fiche n'a pas pu être récupérée sont listés dans "missing_details" (voir coverage_audit.py).
+
+    La ligne de départ enregistre aussi les options du parcours ("options") : un export ne peut
+    être poursuivi qu'avec les mêmes (mêmes résultats de recherche, avec ou sans fiches).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.start_page = None
+        self.end_page = None
+        self.options = None  # Options du parcours, None pour les journaux des anciennes versions
+        self.last_page = None
+        self.offset = None
+        self.done = False
+        self.records = 0
+        self.pages = []  # Lignes de page validées, dans l'ordre
+        self._file = None
+        if os.path.exists(path):
+            self._load()
+
+    @staticmethod
+    def path_for(output_filename):
+        return f"{output_filename}.journal"
+
+    @staticmethod
+    def find_latest(pattern):
+        """
+        Renvoie le fichier de sortie du journal inachevé le plus récent correspondant au motif.
+        """
+        for journal_path in sorted(glob.glob(f"{pattern}.journal"), key=os.path.getmtime, reverse=True):
+            if not CheckpointJournal(journal_path).done:
+                return journal_path[:-len(".journal")]
+        return None
+
+    def _load(self):
+        valid_size = 0
+        with open(self.path, "rb") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Ligne tronquée : tout ce qui suit est ignoré
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                if "start_page" in entry:
+                    self.start_page = entry["start_page"]
+                    self.end_page = entry.get("end_page")
+                    self.options = entry.get("options")
+                    self.offset = entry["offset"]
+                elif "page" in entry:
+                    self.last_page = entry["page"]
+                    self.offset = entry["offset"]
+                    self.records += len(entry["records"])
+                    self.pages.append(entry)
+                elif entry.get("done"):
+                    self.done = True
+        # Remove the truncated tail so new entries start on a clean line
+        with open(self.path, "rb+") as journal_file:
+            journal_file.truncate(valid_size)
+
+    @property
+    def next_page(self):
+        return self.start_page if self.last_page is None else self.last_page + 1
+
+    def _append(self, entry):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def start(self, start_page, offset, end_page=None, options=None):
+        """
+        Démarre un nouveau journal (l'ancien contenu est effacé) avec la page de départ,
+        la taille initiale du fichier de sortie, la dernière page attendue et les options du parcours.
+        """
+        self.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.last_page = None
+        self.done = False
+        self.records = 0
+        self.pages = []
+        self.start_page = start_page
+        self.end_page = end_page
+        self.options = options
+        self.offset = offset
+        entry = {"start_page": start_page, "offset": offset}
+        if end_page is not None:
+            entry["end_page"] = end_page
+        if options is not None:
+            entry["options"] = options
+        self._append(entry)
+
+    def record_page(self, page_number, offset, identifiants, failed=False, missing_details=()):
+        """
+        Valide une page : le fichier de sortie doit déjà contenir ses enregistrements jusqu'à `offset`.
+        """
+        entry = {"page": page_number, "offset": offset, "records": identifiants}
+        if failed:
+            entry["failed"] = True
+        if missing_details:
+            entry["missing_details"] = list(missing_details)
+        self.last_page = page_number
+        self.offset = offset
+        self.records += len(identifiants)
+        self.pages.append(entry)
+        self._append(entry)
+
+    def mark_done(self):
+        self.done = True
+        self._append({"done": True})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
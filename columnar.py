@@ -0,0 +1,141 @@
+import importlib.util
+from datetime import datetime
+from itertools import islice
+
+import records_io
+from compact_records import iter_compact
+
+# Configuration
+BATCH_SIZE = 50000  # Enregistrements normalisés et écrits à la fois (un row group Parquet par lot)
+COMPRESSION = "zstd"
+
+# Typage des colonnes ; les champs non listés restent des chaînes
+FLOAT_FIELDS = ["Longitude", "Latitude", "Volume total (kt)", "Volume total (m³)"]
+DATE_FIELDS = ["Date début validité", "Date fin validité"]
+YEAR_FIELDS = ["Date de fin d'autorisation"]
+BOOLEAN_FIELDS = ["Site en activité", "Exploitation en eau"]
+CATEGORICAL_FIELDS = ["Commune", "Substances", "Produits", "Type", "Nom", "Exploitée par"]  # Encodés en dictionnaire
+BOOLEANS = {"Oui": True, "Non": False}
+
+
+def is_available():
+    """
+    Indique si pyarrow (dépendance optionnelle de l'export Parquet) est installé.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def parse_float(value):
+    """
+    Convertit un nombre écrit à la française ou non ("310.25", "1 200,5") en float, ou None.
+    """
+    if value is None or isinstance(value, float):
+        return value
+    text = str(value).replace("\u00a0", "").replace("\u202f", "").replace(" ", "").replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    """
+    Convertit une date ISO (custom_serializer) ou JJ/MM/AAAA en date, ou None.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    for parse in (datetime.fromisoformat, lambda text: datetime.strptime(text, "%d/%m/%Y")):
+        try:
+            return parse(value).date()
+        except ValueError:
+            pass
+    return None
+
+
+def parse_year(value):
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_bool(value):
+    return BOOLEANS.get(value)
+
+
+def parse_string(value):
+    return None if value is None else str(value)
+
+
+NORMALISERS = {
+    **{field: parse_float for field in FLOAT_FIELDS},
+    **{field: parse_date for field in DATE_FIELDS},
+    **{field: parse_year for field in YEAR_FIELDS},
+    **{field: parse_bool for field in BOOLEAN_FIELDS},
+}
+
+
+def normalise_batch(records, fieldnames):
+    """
+    Convertit un lot d'enregistrements en colonnes typées : {champ: liste de valeurs}.
+    """
+    columns = {}
+    for field in fieldnames:
+        normalise = NORMALISERS.get(field, parse_string)
+        columns[field] = [normalise(record.get(field)) for record in records]
+    return columns
+
+
+def arrow_schema(fieldnames):
+    import pyarrow as pa
+
+    def arrow_type(field):
+        if field in FLOAT_FIELDS:
+            return pa.float64()
+        if field in DATE_FIELDS:
+            return pa.date32()
+        if field in YEAR_FIELDS:
+            return pa.int16()
+        if field in BOOLEAN_FIELDS:
+            return pa.bool_()
+        if field in CATEGORICAL_FIELDS:
+            return pa.dictionary(pa.int32(), pa.string())
+        return pa.string()
+
+    return pa.schema([pa.field(field, arrow_type(field)) for field in fieldnames])
+
+
+def iter_batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def convert_to_parquet(json_filename, parquet_filename, fieldnames=None, batch_size=BATCH_SIZE):
+    """
+    Convertit un fichier NDJSON ou JSON en Parquet typé (coordonnées et volumes en float64,
+    dates, années, booléens Oui/Non, catégories encodées en dictionnaire), lot par lot.
+    Sans `fieldnames`, les colonnes sont collectées par un premier passage (clés triées).
+    Les lots sont gardés en mémoire sous forme de CompactRecord.
+    Renvoie le nombre de lignes écrites (0 sans créer de fichier s'il n'y a aucune donnée).
+    """
+    # pyarrow is optional: only imported when a Parquet file is requested
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fieldnames is None:
+        fieldnames = records_io.collect_fieldnames([json_filename])
+    if not fieldnames:
+        return 0
+    schema = arrow_schema(fieldnames)
+    count = 0
+    with pq.ParquetWriter(parquet_filename, schema, compression=COMPRESSION) as writer:
+        for batch in iter_batches(iter_compact(json_filename), batch_size):
+            writer.write_table(pa.Table.from_pydict(normalise_batch(batch, fieldnames), schema=schema))
+            count += len(batch)
+    return count
@@ -0,0 +1,131 @@
+import sys
+
+import records_io
+from parsers import ADDITIONAL_FIELDS, DETAILS_FIELDS, LISTING_FIELDS
+
+# Configuration
+# Schéma fixe des enregistrements, dans l'ordre des champs des exports : champ -> attribut
+FIELDS = LISTING_FIELDS + ADDITIONAL_FIELDS + DETAILS_FIELDS
+SLOTS = {
+    "Identifiant": "identifiant",
+    "Numéro S3IC": "numero_s3ic",
+    "Commune": "commune",
+    "Site en activité": "site_actif",
+    "Exploitation en eau": "exploitation_en_eau",
+    "Substances": "substances",
+    "Produits": "produits",
+    "Longitude": "longitude",
+    "Latitude": "latitude",
+    "Date de fin d'autorisation": "fin_autorisation",
+    "Type": "type",
+    "Date début validité": "debut_validite",
+    "Date fin validité": "fin_validite",
+    "Volume total (kt)": "volume_kt",
+    "Volume total (m³)": "volume_m3",
+    "Nom": "nom",
+    "Exploitée par": "exploitant",
+}
+# Valeurs très répétées, partagées entre enregistrements (une seule chaîne en mémoire par valeur)
+INTERNED_FIELDS = {
+    "Commune", "Site en activité", "Exploitation en eau", "Substances", "Produits",
+    "Date de fin d'autorisation", "Type", "Exploitée par",
+}
+COORDINATE_FIELDS = {"Longitude", "Latitude"}
+
+
+def parse_coordinate(value):
+    """
+    Convertit une coordonnée texte en float si elle se réécrit à l'identique ("2.190018"), sinon la garde telle quelle.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return number if repr(number) == value else value
+
+
+class CompactRecord:
+    """
+    Enregistrement à schéma fixe (un attribut par champ, sans dictionnaire par instance), pour
+    garder de grands lots en mémoire : les valeurs catégorielles sont internées et les
+    coordonnées stockées en float. Les champs absents restent absents (attribut non défini),
+    les champs hors schéma sont conservés dans `extra` : to_dict() redonne l'enregistrement
+    d'origine, clés dans l'ordre des exports.
+
+    Se lit comme un dict (get, [], in, keys, items), et donc aussi avec csv.DictWriter et dict().
+    """
+
+    __slots__ = tuple(SLOTS.values()) + ("extra",)
+
+    def __init__(self, record):
+        self.extra = None
+        for field, value in record.items():
+            slot = SLOTS.get(field)
+            if slot is None:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[field] = value
+                continue
+            if field in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            elif field in COORDINATE_FIELDS and isinstance(value, str):
+                value = parse_coordinate(value)
+            setattr(self, slot, value)
+
+    def _value(self, field):
+        """
+        Valeur telle qu'écrite dans les exports ; relève AttributeError si le champ est absent.
+        """
+        value = getattr(self, SLOTS[field])
+        if field in COORDINATE_FIELDS and isinstance(value, float):
+            return repr(value)
+        return value
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __getitem__(self, field):
+        try:
+            if field in SLOTS:
+                return self._value(field)
+            if self.extra is not None:
+                return self.extra[field]
+        except AttributeError:
+            pass
+        raise KeyError(field)
+
+    def __contains__(self, field):
+        if field in SLOTS:
+            return hasattr(self, SLOTS[field])
+        return self.extra is not None and field in self.extra
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def to_dict(self):
+        record = {field: self._value(field) for field in FIELDS if hasattr(self, SLOTS[field])}
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def __eq__(self, other):
+        if isinstance(other, CompactRecord):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"CompactRecord({self.to_dict()!r})"
+
+
+def iter_compact(filename):
+    """
+    Parcourt les enregistrements d'un fichier NDJSON ou JSON sous forme de CompactRecord.
+    """
+    for record in records_io.iter_records(filename):
+        yield CompactRecord(record)
@@ -0,0 +1,80 @@
+from collections import Counter, namedtuple
+
+Gaps = namedtuple("Gaps", [
+    "expected_pages", "missing_pages", "failed_pages", "short_pages", "missing_details",
+    "journal_records", "output_records",
+])
+
+
+def count_lines(filename, limit):
+    """
+    Nombre de lignes (enregistrements NDJSON) dans les `limit` premiers octets du fichier.
+    """
+    count = 0
+    remaining = limit
+    with open(filename, "rb") as output:
+        while remaining > 0:
+            chunk = output.read(min(1 << 20, remaining))
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            remaining -= len(chunk)
+    return count
+
+
+def audit(journal, output_filename):
+    """
+    Compare un export à son journal et aux pages attendues :
+    - pages jamais validées (crawl interrompu ou shard manquant),
+    - pages en échec (réponse non 200),
+    - pages avec moins de lignes que la plupart des pages (hors dernière page),
+    - enregistrements dont la fiche mineralinfo n'a pas pu être récupérée, par page.
+    """
+    if journal.start_page is None:
+        raise ValueError(f"Journal {journal.path} absent ou vide : impossible de localiser les trous.")
+    last_page = journal.end_page or journal.last_page or journal.start_page
+    expected_pages = range(journal.start_page, last_page + 1)
+    entries = {entry["page"]: entry for entry in journal.pages}
+    succeeded = [entry for entry in journal.pages if not entry.get("failed")]
+
+    rows_per_page = Counter(len(entry["records"]) for entry in succeeded if entry["page"] != last_page)
+    typical_rows = rows_per_page.most_common(1)[0][0] if rows_per_page else 0
+
+    return Gaps(
+        expected_pages=len(expected_pages),
+        missing_pages=[page for page in expected_pages if page not in entries],
+        failed_pages=[entry["page"] for entry in journal.pages if entry.get("failed")],
+        short_pages=[entry["page"] for entry in succeeded
+                     if entry["page"] != last_page and len(entry["records"]) < typical_rows],
+        missing_details={entry["page"]: entry["missing_details"] for entry in journal.pages
+                         if entry.get("missing_details")},
+        journal_records=journal.records,
+        output_records=count_lines(output_filename, journal.offset or 0),
+    )
+
+
+def is_complete(gaps):
+    return not (gaps.missing_pages or gaps.failed_pages or gaps.short_pages or gaps.missing_details
+                or gaps.journal_records != gaps.output_records)
+
+
+def format_pages(pages, limit=20):
+    shown = ", ".join(str(page) for page in pages[:limit])
+    return shown + (f" ... (+{len(pages) - limit})" if len(pages) > limit else "")
+
+
+def format_report(gaps):
+    """
+    Rapport d'audit lisible, une ligne par type de trou.
+    """
+    missing_details = sum(len(identifiants) for identifiants in gaps.missing_details.values())
+    lines = [
+        f"Pages attendues : {gaps.expected_pages}",
+        f"Pages manquantes : {len(gaps.missing_pages)} {format_pages(gaps.missing_pages)}".rstrip(),
+        f"Pages en échec : {len(gaps.failed_pages)} {format_pages(gaps.failed_pages)}".rstrip(),
+        f"Pages incomplètes : {len(gaps.short_pages)} {format_pages(gaps.short_pages)}".rstrip(),
+        f"Fiches manquantes : {missing_details} (sur {len(gaps.missing_details)} pages)",
+        f"Enregistrements : {gaps.output_records} dans l'export, {gaps.journal_records} dans le journal",
+    ]
+    lines.append("Export complet." if is_complete(gaps) else "Export incomplet : lancer --repair pour combler les trous.")
+    return "\n".join(lines)
@@ -0,0 +1,114 @@
+import csv
+import hashlib
+import json
+import threading
+
+import os
+import sys
+
+import records_io
+from checkpoint import CheckpointJournal
+from parsers import DETAILS_FIELDS
+
+NEW = "nouveau"
+MODIFIED = "modifié"
+REMOVED = "supprimé"
+MISSING_DETAILS = "fiche manquante"  # Ligne inchangée dont la fiche manquait dans l'export précédent
+ABSENT = object()  # Champ de fiche absent de l'enregistrement
+
+
+def pack_enrichment(record):
+    """
+    Champs de fiche d'un enregistrement sous forme compacte : un tuple aligné sur DETAILS_FIELDS
+    (chaînes internées, ABSENT pour un champ absent), ou None si l'enregistrement n'en a aucun.
+    """
+    values = tuple(
+        sys.intern(value) if isinstance(value, str) else value
+        for value in (record.get(field, ABSENT) for field in DETAILS_FIELDS)
+    )
+    return None if all(value is ABSENT for value in values) else values
+
+
+def unpack_enrichment(values):
+    if values is None:
+        return {}
+    return {field: value for field, value in zip(DETAILS_FIELDS, values) if value is not ABSENT}
+
+
+def listing_hash(record, fields):
+    """
+    Empreinte des champs de la page de résultats d'un enregistrement.
+    """
+    values = [record.get(field) for field in fields]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode("utf-8")).digest()
+
+
+class DeltaIndex:
+    """
+    Index des enregistrements d'un export précédent, par Identifiant, pour un export incrémental.
+
+    Seuls l'empreinte des champs de la page de résultats et les champs issus de la fiche
+    mineralinfo (en tuple, voir pack_enrichment) sont conservés en mémoire. Les fiches qui manquaient dans l'export précédent
+    (missing_details de son journal) sont à récupérer même si la ligne est inchangée.
+    """
+
+    def __init__(self, filename, listing_fields):
+        self.listing_fields = listing_fields
+        self.entries = {}
+        for record in records_io.iter_records(filename):
+            self.entries[record["Identifiant"]] = (listing_hash(record, listing_fields), pack_enrichment(record))
+        self.missing_details = set()
+        self.options = None  # Options du parcours de l'export précédent, si son journal les donne
+        journal_path = CheckpointJournal.path_for(filename)
+        if os.path.exists(journal_path):
+            journal = CheckpointJournal(journal_path)
+            self.options = journal.options
+            for entry in journal.pages:
+                self.missing_details.update(entry.get("missing_details", []))
+            journal.close()
+        self.seen = set()
+        self.changes = []
+        self._lock = threading.Lock()  # classify is called from the page worker threads
+
+    def classify(self, record):
+        """
+        Renvoie NEW ou MODIFIED si la fiche doit être récupérée, MISSING_DETAILS si la ligne est
+        inchangée mais sa fiche manquait dans l'export précédent, None si la ligne est inchangée.
+        Seuls NEW et MODIFIED sont des changements.
+        """
+        identifiant = record["Identifiant"]
+        entry = self.entries.get(identifiant)
+        if entry is None:
+            change = NEW
+        elif entry[0] != listing_hash(record, self.listing_fields):
+            change = MODIFIED
+        else:
+            change = None
+        with self._lock:
+            self.seen.add(identifiant)
+            if change:
+                self.changes.append((identifiant, change))
+        if change is None and identifiant in self.missing_details:
+            return MISSING_DETAILS
+        return change
+
+    def enrichment(self, identifiant):
+        return unpack_enrichment(self.entries[identifiant][1])
+
+    def removed(self):
+        """
+        Identifiants de l'export précédent absents des pages parcourues.
+        """
+        return [identifiant for identifiant in self.entries if identifiant not in self.seen]
+
+    def save_changes(self, filename):
+        """
+        Écrit les changements (nouveaux, modifiés, supprimés) dans un fichier CSV, triés par Identifiant.
+        Renvoie le nombre de changements.
+        """
+        changes = sorted(self.changes + [(identifiant, REMOVED) for identifiant in self.removed()])
+        with open(filename, "w", encoding="utf-8", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["Identifiant", "Changement"])
+            writer.writerows(changes)
+        return len(changes)
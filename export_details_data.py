@@ -1,20 +1,61 @@
-import requests
-from bs4 import BeautifulSoup
-import re
+import http_client
+import rate_control
+import records_io
+import metrics
+import coverage_audit
+import columnar
+from record_store import STORE_FILE, RecordStore
+from parsers import ADDITIONAL_FIELDS, LISTING_FIELDS, get_max_pages, parse_details_page, parse_listing_page
+from html_archive import ArchiveReader, ArchiveWriter
+from checkpoint import CheckpointJournal
+from delta import DeltaIndex
+from pipeline import StageStats, ordered_window, run_in_pool
+from response_cache import ResponseCache
+from session_pool import SessionExpired, SessionPool, looks_expired
+from work_queue import LeaseLost, WorkQueue, worker_id
+import os
 import json
-import csv
+import multiprocessing
+import sys
+import threading
+import time
+import argparse
+import glob
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
 
 # Configuration
-FILTERED = False
-BASE_URL = "https://infoterre.brgm.fr/rechercher/pagine.htm"
+FILTERED = False  # Sites en activité uniquement (activé par --filtered)
+DETAILS = True  # Enrichissement par les fiches mineralinfo (désactivé par --no-details)
+INFOTERRE_URL = os.environ.get("INFOTERRE_URL", "https://infoterre.brgm.fr")
+MINERALINFO_URL = os.environ.get("MINERALINFO_URL", "https://www.mineralinfo.fr")
+BASE_URL = f"{INFOTERRE_URL}/rechercher/pagine.htm"
 JSESSIONID = "D002D4FEFBF302B74FB354D558379680"
 HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Cookie": f"JSESSIONID={JSESSIONID}"
 }
 BASE_FILE_NAME = "output/details_results"
+BASIC_FILE_NAME = "output/results"  # Exports sans fiches (--no-details)
 START_PAGE = 2271
+MAX_WORKERS = 4  # Nombre de pages récupérées en parallèle
+SEARCH_SESSIONS = MAX_WORKERS  # Sessions de recherche InfoTerre indépendantes utilisées en parallèle
+DETAILS_MAX_WORKERS = 8  # Nombre de fiches mineralinfo récupérées en parallèle
+PARSE_PROCESSES = os.cpu_count()  # Processus dédiés à l'analyse HTML
+# Parsing processes are not forked from the crawler, whose threads may hold locks (stdout, HTTP pool)
+PARSE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+PAGES_IN_FLIGHT = 2 * MAX_WORKERS  # Pages en cours de traitement avant que l'écriture ne freine la récupération
+CACHE_FILE = "cache/details_cache.sqlite"  # None pour désactiver le cache des fiches
+CACHE_TTL = 30 * 24 * 3600  # Secondes avant revalidation d'une fiche en cache
+CACHE_MAX_SIZE = 1024 ** 3  # Octets
+ARCHIVE_DIR = "archive"  # Dossier par défaut de --archive et --replay
+REPLAY_BATCH_PAGES = 20  # Pages réanalysées par tâche du pool en mode --replay
+WORKER_PROCESSES = 4  # Workers locaux lancés par --coordinator, chacun avec ses propres sessions
+SHARD_POLL_INTERVAL = 10  # Secondes entre deux vérifications de la file de travail
+METRICS_PORT = None  # Port de l'endpoint Prometheus /metrics (None pour le désactiver)
+STAGES = ["sessions", "pages", "analyse pages", "fiches", "analyse fiches", "écriture"]
 
 def get_unique_filename(base_name, extension):
     """
@@ -23,30 +64,38 @@ def get_unique_filename(base_name, extension):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"{base_name}_{timestamp}.{extension}"
 
-json_filename = get_unique_filename(BASE_FILE_NAME, "json")
-csv_filename = get_unique_filename(BASE_FILE_NAME, "csv")
+base_file_name = BASE_FILE_NAME  # BASIC_FILE_NAME with --no-details
+json_filename = get_unique_filename(base_file_name, "ndjson")
+csv_filename = get_unique_filename(base_file_name, "csv")
+filtered = FILTERED
+with_details = DETAILS
+details_cache = None  # ResponseCache of the mineralinfo fiches, opened by main (CACHE_FILE)
 
 
-def get_session_id():
-    session = requests.Session()
-    session.get("https://infoterre.brgm.fr/rechercher/")
-    if 'JSESSIONID' in session.cookies:
-        JSESSIONID = session.cookies['JSESSIONID']
-        print(f"Session ID récupéré: {JSESSIONID}")
-        HEADERS["Cookie"] = f"JSESSIONID={JSESSIONID}"
-        return JSESSIONID
-    else:
-        raise Exception("Impossible de récupérer le JSESSIONID.")
-
-def launch_research():
-    url = "https://infoterre.brgm.fr/rechercher/default.htm;jsessionid=" + JSESSIONID
-    response = requests.get(url, headers=HEADERS)
+def get_session_id(headers=HEADERS):
+    """
+    Ouvre une nouvelle session InfoTerre et enregistre son JSESSIONID dans les en-têtes fournis.
+    """
+    # Empty Cookie header so the shared HTTP session does not resend an existing JSESSIONID
+    response = http_client.get(f"{INFOTERRE_URL}/rechercher/", headers={"User-Agent": headers["User-Agent"], "Cookie": ""})
+    for step in response.history + [response]:
+        if 'JSESSIONID' in step.cookies:
+            jsessionid = step.cookies['JSESSIONID']
+            print(f"Session ID récupéré: {jsessionid}")
+            headers["Cookie"] = f"JSESSIONID={jsessionid}"
+            return jsessionid
+    raise Exception("Impossible de récupérer le JSESSIONID.")
+
+def launch_research(headers=HEADERS):
+    jsessionid = headers["Cookie"].split("=", 1)[1]
+    url = f"{INFOTERRE_URL}/rechercher/default.htm;jsessionid=" + jsessionid
+    response = http_client.get(url, headers=headers)
     if response.status_code == 200:
-        url = "https://infoterre.brgm.fr/rechercher/switch.htm?scope=6"
-        response = requests.get(url, headers=HEADERS)
+        url = f"{INFOTERRE_URL}/rechercher/switch.htm?scope=6"
+        response = http_client.get(url, headers=headers)
         if response.status_code == 200:
-            url = "https://infoterre.brgm.fr/rechercher/search.htm"
-            response = requests.post(url, headers=HEADERS, data={"inValues": "0", "scopeValue": "6", "what": "", "where": "", "carmatSubstance": "", "carmatProduit": "", "carmatGidic": "", "x": "19", "y": "8"})
+            url = f"{INFOTERRE_URL}/rechercher/search.htm"
+            response = http_client.post(url, headers=headers, data={"inValues": "0", "scopeValue": "6", "what": "", "where": "", "carmatSubstance": "", "carmatProduit": "", "carmatGidic": "", "x": "19", "y": "8"})
             if response.status_code == 200:
                 print("Recherche lancée avec succès.")
         else:
@@ -54,25 +103,51 @@ def launch_research():
     else:
         raise Exception(f"Erreur lors du lancement de la recherche: {response.status_code}")
 
-def apply_filter():
-    url = "https://infoterre.brgm.fr/rechercher/refine.htm"
+def apply_filter(headers=HEADERS):
+    url = f"{INFOTERRE_URL}/rechercher/refine.htm"
     data = {"action": "refine", "id": "carmat_actif:true"}
-    response = requests.post(url, headers=HEADERS, data=data)
+    response = http_client.post(url, headers=headers, data=data)
     if response.status_code == 200:
         print("Filtre appliqué avec succès.")
     else:
         raise Exception(f"Erreur lors de l'application du filtre: {response.status_code}")
 
 
+def create_search_session():
+    """
+    Initialise une session de recherche indépendante (JSESSIONID, recherche, filtre) et renvoie ses en-têtes.
+    """
+    with stage_stats.measure("sessions"):
+        headers = dict(HEADERS)
+        get_session_id(headers)
+        launch_research(headers)
+        if filtered:
+            print("Filtrage des résultats...")
+            apply_filter(headers)
+    return headers
+
 
-def fetch_page_content(page_number=1):
+def fetch_page_content(page_number=1, headers=HEADERS):
     """
     Envoie une requête POST pour récupérer le contenu d'une page spécifique.
+    Relève SessionExpired si la session de recherche n'est plus valide ; renvoie None si la page
+    n'a pas pu être récupérée, y compris après l'échec réseau de toutes les tentatives.
     """
+    import requests
+
     data = {"page": str(page_number)}
-    response = requests.post(BASE_URL, headers=HEADERS, data=data)
+    try:
+        response = http_client.post(BASE_URL, headers=headers, data=data, allow_redirects=False)
+    except requests.RequestException as e:
+        # Recorded as a failed page in the journal instead of aborting the crawl
+        print(f"Erreur lors de la récupération de la page {page_number}: {e}")
+        return None
 
+    if response.is_redirect:
+        raise SessionExpired(f"page {page_number} redirigée vers {response.headers.get('Location')}")
     if response.status_code == 200:
+        if looks_expired(response.text):
+            raise SessionExpired(f"page {page_number} sans pagination ni résultats")
         print(f"Page {page_number} récupérée avec succès.")
         return response.text
     else:
@@ -80,274 +155,833 @@ def fetch_page_content(page_number=1):
         return None
 
 
-def get_max_pages(html_content):
+def fetch_listing_page(page_number=1):
     """
-    Récupère le nombre maximum de pages à partir du contenu HTML.
+    Récupère une page de résultats via le pool de sessions de recherche (ou la session de HEADERS sans pool).
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    pagination_element = soup.find("span", id="pagination_last")
-    if pagination_element:
-        match = re.search(r"value\s*=\s*'(\d+)'", pagination_element.get("onclick", ""))
-        if match:
-            return int(match.group(1))
-    print("Nombre maximum de pages introuvable, valeur par défaut utilisée (1).")
-    return 1
+    if search_sessions is None:
+        return fetch_page_content(page_number)
+    return search_sessions.fetch(fetch_page_content, page_number)
 
 
-def extract_field(tr_element, label):
+def fetch_max_pages():
     """
-    Récupère la valeur d'un champ dans un <tr> en fonction du label fourni.
+    Lit le nombre de pages de résultats sur la première page.
     """
-    field = tr_element.find("font", text=lambda t: t and label in t)
-    if field and field.find_next_sibling("font", class_="results_item_field_value"):
-        return field.find_next_sibling("font", class_="results_item_field_value").text.strip()
-    return None
+    first_page_content = fetch_listing_page()
+    if not first_page_content:
+        raise Exception("Première page de résultats inaccessible : nombre de pages inconnu.")
+    return get_max_pages(first_page_content)
 
 
 def fetch_additional_details(carmat_id):
     """
     Fetch additional details for a given Carmat ID.
+    Renvoie None si la fiche n'a pas pu être récupérée (erreur HTTP ou réseau).
     """
-    url = f"https://www.mineralinfo.fr/Fiches/carmat/{carmat_id}"
-    response = requests.get(url, headers=HEADERS)
+    import requests
+
+    url = f"{MINERALINFO_URL}/Fiches/carmat/{carmat_id}"
+    cached = details_cache.lookup(url) if details_cache else None
+    if cached and cached.fresh:
+        return cached.body
+
+    headers = dict(HEADERS, **ResponseCache.conditional_headers(cached))
+    try:
+        response = http_client.get(url, headers=headers)
+    except requests.RequestException as e:
+        # Recorded in the page's missing_details instead of aborting the crawl
+        print(f"Erreur lors de la récupération des détails pour ID : {carmat_id}: {e}")
+        return None
+    if response.status_code == 304 and cached:
+        details_cache.revalidated(url)
+        return cached.body
     if response.status_code == 200:
         print(f"Détails supplémentaires récupérés pour ID {carmat_id}.")
+        if details_cache:
+            details_cache.store(url, response.text, response.headers)
         return response.text
     else:
         print(f"Erreur lors de la récupération des détails pour ID : {carmat_id}: {response.status_code}")
         return None
 
 
-def extract_most_recent_ap(html_content):
+def fetch_details_data(carmat_id):
     """
-    Extracts the most recent AP (Arrêté préfectoral) information from the given HTML content.
+    Récupère la fiche mineralinfo d'un ID et en extrait l'AP le plus récent, le nom et l'exploitant.
+    Renvoie None si la fiche n'a pas pu être récupérée.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    historique_section = soup.find("div", id="historique")
-
-    if not historique_section:
-        print("Section 'historique' introuvable.")
+    with stage_stats.measure("fiches"):
+        details_html = fetch_additional_details(carmat_id)
+    if not details_html:
         return None
+    if html_archive:
+        html_archive.append("fiche", carmat_id, f"{MINERALINFO_URL}/Fiches/carmat/{carmat_id}", details_html)
+    with stage_stats.measure("analyse fiches"):
+        return run_in_pool(parse_pool, parse_details_page, details_html)
 
-    ap_table = historique_section.find("table", class_="table table-bordered")
-    if not ap_table:
-        print("Tableau AP introuvable dans la section 'historique'.")
-        return None
 
-    rows = ap_table.find_all("tr")[1:]  # Skip the header row
-    ap_data = []
+# Shared by every page so the mineralinfo host never sees more than DETAILS_MAX_WORKERS requests at once;
+# created on first use so that importing this module starts no thread
+details_executor = None
+details_executor_lock = threading.Lock()
+parse_pool = None  # ProcessPoolExecutor used for HTML parsing while fetch_all_results runs
+stage_stats = StageStats(STAGES)
+progress = {"pages_total": 0, "pages_done": 0, "records": 0}  # Avancement de fetch_all_results
+delta_index = None  # DeltaIndex of the previous run, set by --delta
+search_sessions = None  # SessionPool of InfoTerre search sessions, set in main
+html_archive = None  # ArchiveWriter keeping every fetched page and fiche, set by --archive
 
-    for row in rows:
-        cols = row.find_all("td")
-        if len(cols) < 6:
-            continue
 
-        try:
-            ap_type = cols[1].text.strip()
-            start_date = datetime.strptime(cols[2].text.strip(), "%Y-%m-%d")
-            end_date = cols[3].text.strip()
-            end_date = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
-            volume_kt = cols[4].text.strip() or None
-            volume_m3 = cols[5].text.strip() or None
-
-            ap_data.append({
-                "Type": ap_type,
-                "Date début validité": start_date,
-                "Date fin validité": end_date,
-                "Volume total (kt)": volume_kt,
-                "Volume total (m³)": volume_m3
-            })
-        except ValueError:
-            continue
+def get_details_executor():
+    global details_executor
+    with details_executor_lock:
+        if details_executor is None:
+            details_executor = ThreadPoolExecutor(max_workers=DETAILS_MAX_WORKERS)
+        return details_executor
 
-    if not ap_data:
-        return None
 
-    return max(ap_data, key=lambda x: x["Date début validité"])
+def extract_results(html_content):
+    """
+    Analyse le contenu HTML pour extraire les données principales et additionnelles.
+    Renvoie les résultats et les identifiants dont la fiche n'a pas pu être récupérée.
+    """
+    with stage_stats.measure("analyse pages"):
+        results, carmat_ids = run_in_pool(parse_pool, parse_listing_page, html_content)
+    if not with_details:
+        return results, []
+
+    # In delta mode, unchanged rows reuse the previous run's enrichment instead of fetching their fiche
+    to_fetch = range(len(results))
+    if delta_index is not None:
+        to_fetch = []
+        for position, result in enumerate(results):
+            if delta_index.classify(result):
+                to_fetch.append(position)
+            else:
+                result.update(delta_index.enrichment(result["Identifiant"]))
+
+    # Fiches fetched in parallel; executor.map keeps them aligned with the rows
+    fetched_details = get_details_executor().map(fetch_details_data, [carmat_ids[position] for position in to_fetch])
+    missing_details = []
+    for position, details in zip(to_fetch, fetched_details):
+        if details is None:
+            missing_details.append(results[position]["Identifiant"])
+        else:
+            results[position].update(details)
+
+    return results, missing_details
 
 
-def extract_additional_data(soup, row_id):
+def process_page(page_number):
     """
-    Récupère les données additionnelles pour une ligne spécifique, identifiée par son ID.
+    Récupère une page de résultats et renvoie ses enregistrements complétés par les fiches
+    et les identifiants sans fiche, ou None si la page n'a pas pu être récupérée.
     """
-    additional_row = soup.find("tr", id=f"results_item_additional_content_{row_id}_null")
-    if not additional_row:
-        return {}
+    with stage_stats.measure("pages"):
+        html_content = fetch_listing_page(page_number)
+    if not html_content:
+        return None
+    if html_archive:
+        html_archive.append("page", page_number, BASE_URL, html_content)
+    return extract_results(html_content)
 
-    additional_data = {
-        "Site en activité": extract_field(additional_row, "Site en activité"),
-        "Exploitation en eau": extract_field(additional_row, "Exploitation en eau"),
-        "Substances": extract_field(additional_row, "Substances"),
-        "Produits": extract_field(additional_row, "Produits"),
-        "Longitude": extract_field(additional_row, "Longitude"),
-        "Latitude": extract_field(additional_row, "Latitude"),
-        "Date de fin d'autorisation": extract_field(additional_row, "Date de fin d'autorisation")
-    }
-    return additional_data
 
+replay_readers = {}  # ArchiveReader per archive directory, kept open in each pool process
 
-def extract_additional_parameters(details_html):
-    soup = BeautifulSoup(details_html, "html.parser")
 
-    # Locate the `identityInfo` div
-    identity_info = soup.find("div", class_="identityInfo")
-    if not identity_info:
-        print("No identityInfo div found.")
-        return "", ""
+def replay_pages(directory, page_numbers, details=True):
+    """
+    Réanalyse des pages archivées et de leurs fiches (sauf sans `details`), sans accès réseau
+    (exécuté dans le pool de processus). Renvoie pour chaque page ses résultats et les
+    identifiants dont la fiche n'est pas dans l'archive.
+    """
+    if directory not in replay_readers:
+        replay_readers[directory] = ArchiveReader(directory)
+    reader = replay_readers[directory]
+    pages = []
+    for page_number in page_numbers:
+        results, carmat_ids = parse_listing_page(reader.read("page", page_number))
+        missing_details = []
+        for result, carmat_id in zip(results, carmat_ids if details else []):
+            details_html = reader.read("fiche", carmat_id)
+            if details_html is None:
+                missing_details.append(result["Identifiant"])
+            else:
+                result.update(parse_details_page(details_html))
+        pages.append((page_number, results, missing_details))
+    return pages
 
-    name = ""
-    exploited_by = ""
 
-    try:
-        # Find all <p> tags within identity_info and iterate over them
-        for p_tag in identity_info.find_all("p"):
-            # Clean the text from nested tags and spaces
-            text = p_tag.get_text(strip=True)
-            if "Nom" in text:
-                name = text.split(":")[1].strip()  # Extract text after ':'
-            elif "Exploitée par" in text:
-                exploited_by = text.split(":")[1].strip()  # Extract text after ':'
-    except Exception as e:
-        print("Error extracting parameters:", e)
+def custom_serializer(obj):
+    """
+    Sérialise les objets non pris en charge par défaut, comme datetime.
+    """
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} non sérialisable.")
 
-    return name, exploited_by
+def find_previous_export():
+    """
+    Renvoie l'export terminé le plus récent de output/ (NDJSON, ou JSON des anciennes versions).
+    """
+    candidates = []
+    # Only timestamped exports, not their derived .basic.ndjson files
+    exports = glob.glob(f"{base_file_name}_????????_??????.json") + glob.glob(f"{base_file_name}_????????_??????.ndjson")
+    for filename in exports:
+        if filename == json_filename:
+            continue
+        journal_path = CheckpointJournal.path_for(filename)
+        if os.path.exists(journal_path) and not CheckpointJournal(journal_path).done:
+            continue
+        candidates.append(filename)
+    return max(candidates, key=lambda filename: os.path.splitext(filename)[0], default=None)
 
 
-def extract_results(html_content):
+def find_latest_journaled_export():
     """
-    Analyse le contenu HTML pour extraire les données principales et additionnelles.
+    Renvoie l'export de output/ dont le journal a été modifié le plus récemment, ou None.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    results = []
+    journals = glob.glob(CheckpointJournal.path_for(f"{base_file_name}_*.ndjson"))
+    return max(journals, key=os.path.getmtime)[:-len(".journal")] if journals else None
 
-    main_rows = soup.find_all("tr", class_="results_item")
-    for row in main_rows:
-        result = {}
 
-        id_element = row.find("a", {"id": lambda x: x and x.startswith("chkItem_")})
-        if id_element:
-            row_id = id_element["id"].split("_")[1]
-            result["Identifiant"] = extract_field(row, "Identifiant")
-            result["Numéro S3IC"] = extract_field(row, "Numéro S3IC")
-            result["Commune"] = extract_field(row, "Commune")
+def parse_context():
+    return multiprocessing.get_context(PARSE_START_METHOD)
 
-            additional_data = extract_additional_data(soup, row_id)
-            result.update(additional_data)
 
-            details_html = fetch_additional_details(row_id.strip('carmat'))
-            if details_html:
-                recent_ap = extract_most_recent_ap(details_html)
-                name, exploited_by = extract_additional_parameters(details_html)
-                if recent_ap:
-                    result.update(recent_ap)
-                if name:
-                    result["Nom"] = name
-                if exploited_by:
-                    result["Exploitée par"] = exploited_by
+def crawl_options():
+    """
+    Options qui déterminent le contenu d'un export, enregistrées dans son journal et son archive.
+    """
+    return {"filtered": filtered, "details": with_details}
 
-            results.append(result)
 
-    return results
+def format_options(options):
+    return f"{'sites en activité' if options['filtered'] else 'tous les sites'}, " \
+           f"{'avec' if options['details'] else 'sans'} fiches"
 
 
-def custom_serializer(obj):
+def check_crawl_options(options, source):
     """
-    Sérialise les objets non pris en charge par défaut, comme datetime.
+    Relève une exception si `source` a été produit avec d'autres options que le parcours courant
+    (None : journal ou archive d'une version qui ne les enregistrait pas, accepté).
     """
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} non sérialisable.")
+    if options is not None and options != crawl_options():
+        raise Exception(f"{source} a été produit avec d'autres options ({format_options(options)}) "
+                        f"que ce parcours ({format_options(crawl_options())}).")
+
 
-def fetch_all_results():
+def restore_crawl_options(options, source):
     """
-    Parcourt toutes les pages dynamiquement et récupère toutes les données des résultats.
-    Les résultats sont enregistrés dans un fichier JSON, puis convertis en CSV à la fin.
+    Reprend les options du parcours d'origine de `source` à la place de celles de la ligne de commande.
     """
-    first_page_content = fetch_page_content()
-    max_pages = get_max_pages(first_page_content)
-    print(f"Nombre maximum de pages détecté : {max_pages}")
+    global filtered, with_details
+    if options is None or options == crawl_options():
+        return
+    print(f"Options du parcours d'origine de {source} reprises : {format_options(options)}.")
+    filtered = options["filtered"]
+    with_details = options["details"]
 
-    # Initialize the JSON file
-    with open(json_filename, "w", encoding="utf-8") as json_file:
-        json_file.write("[")
 
-    results_buffer = []  # Buffer to hold results temporarily
-    dump_interval = 10  # Save every `dump_interval` pages
+def metrics_state():
+    return metrics.snapshot(stage_stats, progress)
 
-    try:
-        for page_number in range(START_PAGE, max_pages + 1):
-            html_content = fetch_page_content(page_number)
-            if html_content:
-                results = extract_results(html_content)
-                results_buffer.extend(results)
-
-            # Periodically dump results to JSON
-            if page_number % dump_interval == 0 or page_number == max_pages:
-                with open(json_filename, "a", encoding="utf-8") as json_file:
-                    for result in results_buffer:
-                        json.dump(result, json_file, ensure_ascii=False, indent=4, default=custom_serializer)
-                        json_file.write(",\n")  # Add comma between JSON objects
-                results_buffer.clear()  # Clear buffer to free memory
-                print(f"Résultats des pages jusqu'à {page_number} sauvegardés.")
-
-        # Remove trailing comma and close the JSON array
+
+def fetch_all_results(resume=False, start_page=START_PAGE, end_page=None, lease_lost=None):
+    """
+    Parcourt toutes les pages dynamiquement et récupère toutes les données des résultats.
+    Les résultats sont ajoutés au fil de l'eau dans un fichier NDJSON, puis convertis en CSV à la fin.
+    Chaque page sauvegardée est validée dans un journal ; avec `resume`, l'export reprend
+    après la dernière page validée du même fichier, qui doit donc avoir un journal.
+    Avec `end_page`, seules les pages start_page..end_page sont parcourues (un shard) ; dès que
+    l'événement `lease_lost` est positionné, plus rien n'est écrit et LeaseLost est relevée.
+    La progression et les statistiques par étage sont écrites régulièrement (en JSON) dans un fichier .stats.
+    """
+    global parse_pool
+    journal = CheckpointJournal(CheckpointJournal.path_for(json_filename))
+    if resume and journal.start_page is None:
+        # Without a journal nothing tells which pages the file holds: never overwrite it
+        raise Exception(f"Aucun journal pour {json_filename} : l'export ne peut pas être repris.")
+    if resume:
+        # Rows of another search, or without fiches, must not be appended to this export
+        check_crawl_options(journal.options, json_filename)
+
+    if end_page is None:
+        max_pages = fetch_max_pages()
+        print(f"Nombre maximum de pages détecté : {max_pages}")
+    else:
+        max_pages = end_page
+
+    if resume:
+        if journal.done:
+            print(f"L'export {json_filename} est déjà terminé.")
+            journal.close()
+            return json_filename
+        start_page = journal.next_page
+        # Drop everything written after the last committed page
         with open(json_filename, "rb+") as json_file:
-            json_file.seek(0, 2)  # Move to the end of the file
-            json_file.seek(json_file.tell() - 2, 0)  # Remove last comma
-            json_file.write(b"]")
+            json_file.truncate(journal.offset)
+        print(f"Reprise à la page {start_page} ({journal.records} résultats déjà sauvegardés).")
+    else:
+        # Initialize the output file
+        open(json_filename, "w").close()
+        journal.start(start_page, 0, max_pages, crawl_options())
+
+    progress.update(pages_total=max_pages - start_page + 1, pages_done=0, records=journal.records,
+                    started_at=time.monotonic())
+    # Not a .json name: output/ only holds exports, which merge_data reads
+    stats_filename = os.path.splitext(json_filename)[0] + ".stats"
+    committed_pages = []  # Pages written but not yet committed to the journal
+    dump_interval = 10  # Commit every `dump_interval` pages
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, \
+                ProcessPoolExecutor(max_workers=PARSE_PROCESSES, mp_context=parse_context()) as parse_pool, \
+                records_io.NdjsonWriter(json_filename, default=custom_serializer) as writer, \
+                metrics.Reporter(metrics_state, stats_filename):
+            # Pages are fetched and parsed concurrently, at most PAGES_IN_FLIGHT at a time,
+            # and handed to this single writer in page order
+            pages = range(start_page, max_pages + 1)
+            for page_number, page in ordered_window(partial(executor.submit, process_page), pages, PAGES_IN_FLIGHT):
+                # A failed page is committed empty and flagged, so --audit/--repair can find it
+                results, missing_details = page if page is not None else ([], [])
+                if lease_lost is not None and lease_lost.is_set():
+                    # Another worker owns the shard files now
+                    raise LeaseLost(f"shard abandonné avant la page {page_number}")
+                with stage_stats.measure("écriture", items=len(results)):
+                    for result in results:
+                        writer.write(result)
+                    identifiants = [result["Identifiant"] for result in results]
+                    committed_pages.append((page_number, writer.flush(), identifiants, page is None, missing_details))
+                    progress["pages_done"] += 1
+                    progress["records"] += len(results)
+
+                    # Sync the output, then commit its pages to the journal
+                    if len(committed_pages) == dump_interval or page_number == max_pages:
+                        writer.flush(sync=True)
+                        for committed_page, offset, committed_identifiants, failed, missing in committed_pages:
+                            journal.record_page(committed_page, offset, committed_identifiants, failed, missing)
+                        committed_pages.clear()
+                        print(f"Résultats des pages jusqu'à {page_number} sauvegardés.")
+                        print(stage_stats.format())
+                        print(rate_control.format_limits())
+
+        journal.mark_done()
+        failed_pages = sum(1 for entry in journal.pages if entry.get("failed"))
+        missing_details = sum(len(entry.get("missing_details", [])) for entry in journal.pages)
+        if failed_pages or missing_details:
+            print(f"{failed_pages} pages en échec et {missing_details} fiches manquantes : "
+                  f"relancer avec --repair {json_filename} pour les récupérer.")
 
     except Exception as e:
         print(f"Erreur : {e}")
-        # Ensure the JSON array is closed if there's an error
-        with open(json_filename, "a", encoding="utf-8") as json_file:
-            json_file.write("]")
         raise
+    finally:
+        parse_pool = None
+        journal.close()
 
     print(f"Résultats sauvegardés dans {json_filename}.")
     return json_filename
 
 
-def convert_json_to_csv():
+def replay_archive(directory):
     """
-    Convertit les données d'un fichier JSON en fichier CSV.
+    Reproduit l'export à partir d'une archive HTML (--archive), sans accès réseau : les pages
+    sont réanalysées par lots dans le pool de processus et écrites dans l'ordre, avec un journal.
+    Les pages absentes de l'archive et les fiches non archivées (lignes inchangées d'un export
+    --delta, échecs) apparaissent comme des trous pour --audit et --repair.
     """
+    reader = ArchiveReader(directory)
+    page_numbers = sorted(int(key) for key in reader.keys("page"))
+    reader.close()
+    if not page_numbers:
+        raise Exception(f"Aucune page dans l'archive {directory}.")
+    if len(reader.options) > 1:
+        raise Exception(f"L'archive {directory} mélange des parcours aux options différentes : "
+                        + " ; ".join(format_options(options) for options in reader.options) + ".")
+    restore_crawl_options(reader.options[0] if reader.options else None, directory)
+    print(f"Réanalyse de {len(page_numbers)} pages archivées dans {directory}.")
+
+    batches = [page_numbers[start:start + REPLAY_BATCH_PAGES] for start in range(0, len(page_numbers), REPLAY_BATCH_PAGES)]
+    journal = CheckpointJournal(CheckpointJournal.path_for(json_filename))
+    journal.start(page_numbers[0], 0, page_numbers[-1], crawl_options())
+    progress.update(pages_total=len(page_numbers), pages_done=0, records=0, started_at=time.monotonic())
     try:
-        with open(json_filename, "r", encoding="utf-8") as json_file:
-            data = json.load(json_file)
+        with ProcessPoolExecutor(max_workers=PARSE_PROCESSES, mp_context=parse_context()) as pool, \
+                records_io.NdjsonWriter(json_filename, default=custom_serializer, mode="w") as writer:
+            for _, pages in ordered_window(partial(pool.submit, replay_pages, directory, details=with_details), batches, 2 * PARSE_PROCESSES):
+                committed_pages = []
+                for page_number, results, missing_details in pages:
+                    for result in results:
+                        writer.write(result)
+                    identifiants = [result["Identifiant"] for result in results]
+                    committed_pages.append((page_number, writer.flush(), identifiants, missing_details))
+                    progress["records"] += len(results)
+                writer.flush(sync=True)
+                for page_number, offset, identifiants, missing_details in committed_pages:
+                    journal.record_page(page_number, offset, identifiants, missing_details=missing_details)
+                progress["pages_done"] += len(pages)
+                print(metrics.format_progress(metrics_state()))
+        journal.mark_done()
+    finally:
+        journal.close()
+
+    print(f"Résultats réanalysés sauvegardés dans {json_filename}.")
+    return json_filename
 
-        if not data:
-            print("Aucune donnée à convertir en CSV.")
-            return
 
-        # Collect all unique keys
-        all_fieldnames = set()
-        for result in data:
-            all_fieldnames.update(result.keys())
+def refetch_details(records, identifiants):
+    """
+    Récupère à nouveau les fiches manquantes et complète les enregistrements correspondants.
+    Renvoie les identifiants dont la fiche manque toujours.
+    """
+    by_identifiant = {record["Identifiant"]: record for record in records}
+    still_missing = []
+    # Carmat IDs are the Identifiant values (rows are named "carmat<Identifiant>")
+    for identifiant, details in zip(identifiants, get_details_executor().map(fetch_details_data, identifiants)):
+        if details is None:
+            still_missing.append(identifiant)
+        else:
+            by_identifiant[identifiant].update(details)
+    return still_missing
 
-        # Write to CSV
-        with open(csv_filename, "w", encoding="utf-8", newline="") as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=sorted(all_fieldnames))  # Sort keys for consistent order
-            writer.writeheader()
-            writer.writerows(data)
+
+def repair_export(filename):
+    """
+    Récupère à nouveau les pages manquantes, en échec ou incomplètes et les fiches manquantes
+    relevées par l'audit, puis réécrit l'export et son journal avec les trous comblés.
+    Les pages sans trou sont recopiées telles quelles.
+    """
+    journal = CheckpointJournal(CheckpointJournal.path_for(filename))
+    # Refetched pages and fiches must come from the same search as the rest of the export
+    check_crawl_options(journal.options, filename)
+    gaps = coverage_audit.audit(journal, filename)
+    print(coverage_audit.format_report(gaps))
+    if coverage_audit.is_complete(gaps):
+        journal.close()
+        return 0
+
+    refetch = sorted(set(gaps.missing_pages + gaps.failed_pages + gaps.short_pages))
+    print(f"{len(refetch)} pages à récupérer à nouveau.")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        refetched = dict(zip(refetch, executor.map(process_page, refetch)))
+
+    repaired_filename = f"{filename}.repair"
+    repaired = CheckpointJournal(CheckpointJournal.path_for(repaired_filename))
+    repaired.start(journal.start_page, 0, journal.end_page, journal.options)
+    entries = {entry["page"]: entry for entry in journal.pages}
+    last_page = journal.end_page or journal.last_page
+    position = 0
+    with open(filename, "rb") as output, \
+            records_io.NdjsonWriter(repaired_filename, default=custom_serializer, mode="w") as writer:
+        for page_number in range(journal.start_page, last_page + 1):
+            entry = entries.get(page_number)
+            records, missing_details, failed = [], [], True
+            if entry is not None:
+                chunk = output.read(entry["offset"] - position)
+                position = entry["offset"]
+                records = [json.loads(line) for line in chunk.splitlines()]
+                missing_details = entry.get("missing_details", [])
+                failed = entry.get("failed", False)
+            if refetched.get(page_number) is not None:
+                records, missing_details = refetched[page_number]
+                failed = False
+            if entry is None and failed:
+                continue  # Still unavailable: left out, so the next audit reports it again
+            if missing_details:
+                missing_details = refetch_details(records, missing_details)
+            for record in records:
+                writer.write(record)
+            repaired.record_page(page_number, writer.flush(), [record["Identifiant"] for record in records],
+                                 failed, missing_details)
+
+    repaired_gaps = coverage_audit.audit(repaired, repaired_filename)
+    if journal.done or not repaired_gaps.missing_pages:
+        repaired.mark_done()
+    repaired.close()
+    journal.close()
+    os.replace(repaired_filename, filename)
+    os.replace(repaired.path, journal.path)
+    print(f"Export {filename} réparé :")
+    print(coverage_audit.format_report(repaired_gaps))
+    return len(refetch)
+
+
+def run_worker(queue_filename):
+    """
+    Prend les shards de la file de travail un à un et exporte leurs pages dans un fichier NDJSON
+    par shard. Un shard repris après la mort de son worker repart de la dernière page validée
+    dans son journal.
+    """
+    global json_filename
+    queue = WorkQueue(queue_filename)
+    worker = worker_id()
+    try:
+        while True:
+            shard = queue.claim(worker)
+            if shard is None:
+                if not queue.remaining():
+                    break
+                # Shards leased by other workers are taken over if their lease expires
+                time.sleep(SHARD_POLL_INTERVAL)
+                continue
+            print(f"Worker {worker} : shard {shard.id} (pages {shard.first_page} à {shard.last_page}).")
+            json_filename = queue.output_for(shard)
+            try:
+                with queue.lease(shard, worker) as lease_lost:
+                    # A shard taken over from a dead worker resumes from its journal
+                    resume = os.path.exists(CheckpointJournal.path_for(json_filename))
+                    fetch_all_results(resume=resume, start_page=shard.first_page, end_page=shard.last_page,
+                                      lease_lost=lease_lost)
+            except LeaseLost:
+                print(f"Shard {shard.id} repris par un autre worker, passage au shard suivant.")
+                continue
+            if not queue.complete(shard, worker):
+                print(f"Shard {shard.id} terminé par un autre worker.")
+            print(queue.format_progress())
+    finally:
+        queue.close()
+
+
+def run_coordinator(queue_filename, workers=WORKER_PROCESSES, start_page=START_PAGE):
+    """
+    Crée (ou reprend) la file de travail, lance `workers` workers locaux, attend que tous les
+    shards soient terminés (y compris par des workers d'autres machines) puis fusionne leurs
+    fichiers, dans l'ordre des pages, dans json_filename, et leurs journaux dans le sien
+    (positions décalées), pour que --audit, --repair et --resume s'appliquent à l'export fusionné.
+    """
+    queue = WorkQueue(queue_filename)
+    try:
+        max_pages = fetch_max_pages()
+        print(f"Nombre maximum de pages détecté : {max_pages}")
+        print(f"{queue.create(start_page, max_pages)} shards dans la file {queue_filename}.")
+
+        command = [sys.executable, os.path.abspath(__file__), "--worker", queue_filename]
+        if html_archive:
+            command += ["--archive", html_archive.directory]
+        if filtered:
+            command.append("--filtered")
+        if not with_details:
+            command.append("--no-details")
+        processes = [subprocess.Popen(command) for _ in range(workers)]
+        while queue.remaining():
+            if processes and all(process.poll() is not None for process in processes):
+                raise Exception(
+                    f"Tous les workers locaux se sont arrêtés avant la fin ({queue.format_progress()}). "
+                    f"Relancer avec --coordinator {queue_filename} pour reprendre."
+                )
+            time.sleep(SHARD_POLL_INTERVAL)
+            print(queue.format_progress())
+        for process in processes:
+            process.wait()
+
+        shards = queue.shards()
+        for shard in shards:
+            # A worker started with other flags crawled another search: nothing is merged
+            shard_journal = CheckpointJournal(CheckpointJournal.path_for(queue.output_for(shard)))
+            shard_journal.close()
+            check_crawl_options(shard_journal.options, queue.output_for(shard))
+        journal = CheckpointJournal(CheckpointJournal.path_for(json_filename))
+        journal.start(shards[0].first_page, 0, shards[-1].last_page, crawl_options())
+        all_done = True
+        with open(json_filename, "wb") as output:
+            for shard in shards:
+                shard_filename = queue.output_for(shard)
+                shard_journal = CheckpointJournal(CheckpointJournal.path_for(shard_filename))
+                base_offset = output.tell()
+                with open(shard_filename, "rb") as shard_file:
+                    # Only the committed part of the shard file (a shard holds SHARD_PAGES pages)
+                    output.write(shard_file.read(shard_journal.offset or 0))
+                output.flush()
+                os.fsync(output.fileno())
+                for entry in shard_journal.pages:
+                    journal.record_page(entry["page"], base_offset + entry["offset"], entry["records"],
+                                        entry.get("failed", False), entry.get("missing_details", ()))
+                all_done = all_done and shard_journal.done
+                shard_journal.close()
+        if all_done:
+            journal.mark_done()
+        journal.close()
+        print(f"Résultats des shards fusionnés dans {json_filename}.")
+    finally:
+        queue.close()
+    return json_filename
+
+
+def convert_json_to_csv():
+    """
+    Convertit les données du fichier NDJSON en fichier CSV, sans le charger en mémoire.
+    """
+    try:
+        if not records_io.convert_to_csv(json_filename, csv_filename):
+            print("Aucune donnée à convertir en CSV.")
+            return
 
         print(f"Résultats convertis en CSV et sauvegardés dans {csv_filename}.")
     except Exception as e:
         print(f"Erreur lors de la conversion JSON -> CSV : {e}")
 
 
-# Main
-if __name__ == "__main__":
+def convert_json_to_parquet():
+    """
+    Convertit les données du fichier NDJSON en fichier Parquet typé (pyarrow requis).
+    """
+    parquet_filename = os.path.splitext(json_filename)[0] + ".parquet"
+    if not columnar.is_available():
+        print("pyarrow non installé : export Parquet ignoré.")
+        return
     try:
-        get_session_id()
-        launch_research()
+        if not columnar.convert_to_parquet(json_filename, parquet_filename):
+            print("Aucune donnée à convertir en Parquet.")
+            return
 
-        if FILTERED:
-            print("Filtrage des résultats...")
-            apply_filter()
+        print(f"Résultats convertis en Parquet et sauvegardés dans {parquet_filename}.")
+    except Exception as e:
+        print(f"Erreur lors de la conversion JSON -> Parquet : {e}")
+
+
+def save_to_store(store_filename=STORE_FILE):
+    """
+    Importe l'export dans la base SQLite indexée (upsert par Identifiant).
+    """
+    try:
+        store = RecordStore(store_filename)
+        try:
+            count = store.import_file(json_filename)
+        finally:
+            store.close()
+        print(f"{count} résultats importés dans la base {store_filename}.")
+    except Exception as e:
+        print(f"Erreur lors de l'import dans la base SQLite : {e}")
 
-        json_file = fetch_all_results()
-        convert_json_to_csv()
 
+def save_basic_outputs():
+    """
+    Écrit le jeu de données de base (champs des pages de résultats, sans les fiches) à partir de
+    l'export détaillé, en NDJSON et en CSV : les deux jeux sortent du même parcours des pages.
+    """
+    fieldnames = LISTING_FIELDS + ADDITIONAL_FIELDS
+    basic_filename = os.path.splitext(json_filename)[0] + ".basic.ndjson"
+    basic_csv_filename = os.path.splitext(json_filename)[0] + ".basic.csv"
+    try:
+        with records_io.NdjsonWriter(basic_filename, mode="w") as writer:
+            for record in records_io.iter_records(json_filename):
+                writer.write({field: record.get(field) for field in fieldnames})
+        records_io.convert_to_csv(basic_filename, basic_csv_filename, fieldnames=fieldnames)
+        print(f"Résultats de base sauvegardés dans {basic_filename} et {basic_csv_filename}.")
     except Exception as e:
-        print(f"Erreur : {e}")
\ No newline at end of file
+        print(f"Erreur lors de l'écriture des résultats de base : {e}")
+
+
+def save_outputs(parquet=False, store_filename=None, basic=False):
+    """
+    Produit les fichiers dérivés de l'export NDJSON : CSV, et sur demande Parquet, base SQLite
+    et jeu de données de base (inutile sans fiches, l'export l'est déjà).
+    """
+    convert_json_to_csv()
+    if basic and with_details:
+        save_basic_outputs()
+    if parquet:
+        convert_json_to_parquet()
+    if store_filename:
+        save_to_store(store_filename)
+
+
+def main(argv=None):
+    """
+    Point d'entrée en ligne de commande du moteur d'export (aussi utilisé par export_data.py).
+    """
+    global json_filename, csv_filename, base_file_name, filtered, with_details, html_archive, search_sessions, \
+        delta_index, details_cache
+
+    parser = argparse.ArgumentParser(description="Export des carrières InfoTerre, enrichies par les fiches mineralinfo.")
+    parser.add_argument(
+        "--resume", nargs="?", const="latest", metavar="FICHIER_NDJSON",
+        help="reprendre un export interrompu (par défaut le plus récent de output/)",
+    )
+    parser.add_argument(
+        "--delta", nargs="?", const="latest", metavar="EXPORT_PRECEDENT",
+        help="export complet incrémental : ne récupère que les fiches nouvelles ou modifiées "
+             "depuis l'export précédent (par défaut le plus récent de output/)",
+    )
+    parser.add_argument(
+        "--audit", nargs="?", const="latest", metavar="FICHIER_NDJSON",
+        help="vérifier qu'un export contient toutes les pages et fiches attendues (par défaut le plus récent de output/)",
+    )
+    parser.add_argument(
+        "--repair", nargs="?", const="latest", metavar="FICHIER_NDJSON",
+        help="récupérer à nouveau uniquement les pages et fiches manquantes d'un export et les y intégrer",
+    )
+    parser.add_argument(
+        "--convert", nargs="?", const="latest", metavar="FICHIER_NDJSON",
+        help="produire uniquement les fichiers dérivés (CSV, --parquet, --store, --basic) d'un export existant",
+    )
+    parser.add_argument(
+        "--no-details", dest="details", action="store_false",
+        help="ne pas récupérer les fiches mineralinfo : export des seules pages de résultats",
+    )
+    parser.add_argument(
+        "--basic", action="store_true",
+        help="écrire aussi le jeu de données de base (champs des pages de résultats) issu du même parcours",
+    )
+    parser.add_argument(
+        "--filtered", action="store_true", default=FILTERED,
+        help="ne parcourir que les sites en activité",
+    )
+    parser.add_argument(
+        "--start-page", type=int, default=START_PAGE, metavar="PAGE",
+        help=f"première page de résultats parcourue (défaut {START_PAGE})",
+    )
+    parser.add_argument(
+        "--parquet", action="store_true",
+        help="écrire aussi un fichier Parquet typé à côté du CSV (nécessite pyarrow)",
+    )
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_FILE, metavar="BASE_SQLITE",
+        help=f"importer aussi les résultats dans une base SQLite indexée (défaut {STORE_FILE}), "
+             "interrogeable avec record_store.py query",
+    )
+    parser.add_argument(
+        "--archive", nargs="?", const=ARCHIVE_DIR, metavar="DOSSIER",
+        help=f"archiver chaque page et fiche récupérée (HTML compressé, défaut {ARCHIVE_DIR}/) pour --replay",
+    )
+    parser.add_argument(
+        "--replay", nargs="?", const=ARCHIVE_DIR, metavar="DOSSIER",
+        help="reproduire l'export à partir d'une archive HTML, sans accès réseau",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=METRICS_PORT, metavar="PORT",
+        help="exposer les métriques au format Prometheus sur http://0.0.0.0:PORT/metrics",
+    )
+    parser.add_argument(
+        "--coordinator", metavar="FICHIER_FILE",
+        help="crawl distribué : découpe les pages en shards dans cette file SQLite (reprise si elle existe), "
+             "lance les workers locaux puis fusionne les résultats",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=WORKER_PROCESSES,
+        help=f"workers locaux lancés par --coordinator (défaut {WORKER_PROCESSES}, 0 pour des workers distants seuls)",
+    )
+    parser.add_argument(
+        "--worker", metavar="FICHIER_FILE",
+        help="traiter les shards d'une file créée par --coordinator (éventuellement depuis une autre machine)",
+    )
+    args = parser.parse_args(argv)
+
+    filtered = args.filtered
+    with_details = args.details
+    if not with_details:
+        base_file_name = BASIC_FILE_NAME
+        json_filename = get_unique_filename(base_file_name, "ndjson")
+        csv_filename = get_unique_filename(base_file_name, "csv")
+
+    try:
+        if CACHE_FILE:
+            details_cache = ResponseCache(CACHE_FILE, ttl=CACHE_TTL, max_size=CACHE_MAX_SIZE)
+
+        if args.resume and args.delta:
+            raise Exception("--resume et --delta ne peuvent pas être combinés.")
+        if (args.coordinator or args.worker) and (args.resume or args.delta):
+            raise Exception("--coordinator et --worker ne peuvent pas être combinés avec --resume ou --delta.")
+
+        if sum(bool(option) for option in (args.resume or args.delta, args.coordinator or args.worker,
+                                           args.audit, args.repair, args.replay, args.convert)) > 1:
+            raise Exception("--audit, --repair, --replay et --convert ne peuvent pas être combinés avec un autre mode.")
+        if args.delta and not with_details:
+            raise Exception("--delta ne peut pas être combiné avec --no-details.")
+        if args.archive and args.replay:
+            raise Exception("--archive et --replay ne peuvent pas être combinés.")
+
+        if args.resume:
+            json_filename = args.resume
+            if args.resume == "latest":
+                json_filename = CheckpointJournal.find_latest(f"{base_file_name}_*.ndjson")
+            if not json_filename:
+                raise Exception("Aucun export interrompu à reprendre.")
+            if not os.path.exists(CheckpointJournal.path_for(json_filename)):
+                raise Exception(f"Aucun journal pour {json_filename} : l'export ne peut pas être repris.")
+            csv_filename = os.path.splitext(json_filename)[0] + ".csv"
+        elif args.repair:
+            json_filename = find_latest_journaled_export() if args.repair == "latest" else args.repair
+            if not json_filename:
+                raise Exception("Aucun export avec journal trouvé.")
+            csv_filename = os.path.splitext(json_filename)[0] + ".csv"
+        if args.resume or args.repair:
+            # Resuming or repairing continues the original crawl, whatever the flags given now
+            journal = CheckpointJournal(CheckpointJournal.path_for(json_filename))
+            journal.close()
+            restore_crawl_options(journal.options, json_filename)
+
+        if args.archive:
+            html_archive = ArchiveWriter(args.archive, options=crawl_options())
+
+        if args.metrics_port:
+            metrics.serve(args.metrics_port, metrics_state)
+
+        if args.replay:
+            replay_archive(args.replay)
+            save_outputs(args.parquet, args.store, args.basic)
+        elif args.convert:
+            json_filename = find_previous_export() if args.convert == "latest" else args.convert
+            if not json_filename:
+                raise Exception("Aucun export à convertir.")
+            csv_filename = os.path.splitext(json_filename)[0] + ".csv"
+            save_outputs(args.parquet, args.store, args.basic)
+        elif args.audit:
+            export_filename = find_latest_journaled_export() if args.audit == "latest" else args.audit
+            if not export_filename:
+                raise Exception("Aucun export avec journal trouvé.")
+            print(f"Audit de {export_filename} :")
+            print(coverage_audit.format_report(
+                coverage_audit.audit(CheckpointJournal(CheckpointJournal.path_for(export_filename)), export_filename)))
+        elif args.repair:
+            search_sessions = SessionPool(create_search_session, SEARCH_SESSIONS)
+            repair_export(json_filename)
+            save_outputs(args.parquet, args.store, args.basic)
+        elif args.worker:
+            search_sessions = SessionPool(create_search_session, SEARCH_SESSIONS)
+            run_worker(args.worker)
+        elif args.coordinator:
+            # The coordinator only reads the page count; each worker opens its own sessions
+            search_sessions = SessionPool(create_search_session, 1)
+            run_coordinator(args.coordinator, args.workers, args.start_page)
+            save_outputs(args.parquet, args.store, args.basic)
+        else:
+            if args.delta:
+                previous_filename = find_previous_export() if args.delta == "latest" else args.delta
+                if not previous_filename:
+                    raise Exception("Aucun export précédent trouvé pour l'export incrémental.")
+                delta_index = DeltaIndex(previous_filename, LISTING_FIELDS + ADDITIONAL_FIELDS)
+                # Compared with another search, every row would look new or removed
+                check_crawl_options(delta_index.options, previous_filename)
+                print(f"Export incrémental à partir de {previous_filename} ({len(delta_index.entries)} enregistrements, "
+                      f"{len(delta_index.missing_details)} fiches manquantes à récupérer).")
+
+            search_sessions = SessionPool(create_search_session, SEARCH_SESSIONS)
+
+            # A delta run produces a full snapshot, so it always starts from the first page
+            fetch_all_results(resume=bool(args.resume), start_page=1 if args.delta else args.start_page)
+            save_outputs(args.parquet, args.store, args.basic)
+
+            if delta_index is not None:
+                changes_filename = os.path.splitext(json_filename)[0] + ".changes.csv"
+                count = delta_index.save_changes(changes_filename)
+                print(f"{count} changements sauvegardés dans {changes_filename}.")
+
+    except Exception as e:
+        print(f"Erreur : {e}")
+    finally:
+        if html_archive:
+            html_archive.close()
+        print(http_client.format_stats())
+        print(rate_control.format_limits())
+        if search_sessions:
+            print(search_sessions.format_stats())
+        if details_cache:
+            print(details_cache.format_stats())
+
+
+# Main
+if __name__ == "__main__":
+    main()
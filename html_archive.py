@@ -0,0 +1,124 @@
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# Configuration
+SEGMENT_SIZE = 256 * 1024 ** 2  # Octets compressés par segment avant d'en ouvrir un nouveau
+COMPRESS_LEVEL = 6
+
+
+class ArchiveWriter:
+    """
+    Archive en ajout seul des réponses HTML récupérées, pour pouvoir les réanalyser sans réseau.
+
+    Chaque réponse est un membre gzip ajouté à la fin d'un segment (comme un fichier WARC.gz) ;
+    l'index NDJSON du segment donne pour chaque réponse son type, sa clé, son URL, sa date,
+    sa position et sa longueur. Une ligne d'index n'est écrite qu'après la réponse : une réponse
+    tronquée par un arrêt brutal n'est donc jamais référencée. Chaque processus écrit ses propres
+    segments, nommés par date de création et PID. La première ligne de chaque index donne les
+    options du parcours (`options`), que la réanalyse reprend.
+    """
+
+    def __init__(self, directory, segment_size=SEGMENT_SIZE, options=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.options = options
+        self.prefix = f"segment_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+        self.segments = 0
+        self._lock = threading.Lock()
+        self._data = None
+        self._index = None
+        self._open_segment()
+
+    def _open_segment(self):
+        self.close()
+        self.segments += 1
+        name = f"{self.prefix}_{self.segments:04d}"
+        self._segment = f"{name}.html.gz"
+        self._data = open(os.path.join(self.directory, self._segment), "ab")
+        self._index = open(os.path.join(self.directory, f"{name}.idx"), "a", encoding="utf-8")
+        if self.options is not None:
+            self._index.write(json.dumps({"options": self.options}, ensure_ascii=False) + "\n")
+            self._index.flush()
+
+    def append(self, kind, key, url, body):
+        """
+        Archive une réponse ; `kind` ("page" ou "fiche") et `key` (numéro de page, ID carmat) l'identifient.
+        """
+        data = gzip.compress(body.encode("utf-8"), compresslevel=COMPRESS_LEVEL)
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(data)
+            self._data.flush()
+            entry = {
+                "kind": kind, "key": str(key), "url": url, "time": time.time(),
+                "segment": self._segment, "offset": offset, "length": len(data),
+            }
+            self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._index.flush()
+            if offset + len(data) >= self.segment_size:
+                self._open_segment()
+
+    def close(self):
+        for archive_file in (self._data, self._index):
+            if archive_file is not None:
+                archive_file.close()
+
+
+def load_index(directory):
+    """
+    Dernière version archivée de chaque réponse, {(type, clé): entrée d'index}, et options
+    distinctes des parcours qui ont écrit l'archive.
+    """
+    entries = {}
+    options = []
+    for index_path in sorted(glob.glob(os.path.join(directory, "segment_*.idx"))):
+        with open(index_path, "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Ligne tronquée par un arrêt brutal
+                if "options" in entry:
+                    if entry["options"] not in options:
+                        options.append(entry["options"])
+                    continue
+                entries[(entry["kind"], entry["key"])] = entry
+    return entries, options
+
+
+class ArchiveReader:
+    """
+    Lecture des réponses d'une archive par type et clé, les segments restant ouverts.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries, self.options = load_index(directory)
+        self._files = {}
+
+    def keys(self, kind):
+        return [key for entry_kind, key in self.entries if entry_kind == kind]
+
+    def read(self, kind, key):
+        """
+        Renvoie le HTML archivé, ou None si la réponse n'est pas dans l'archive.
+        """
+        entry = self.entries.get((kind, str(key)))
+        if entry is None:
+            return None
+        segment = self._files.get(entry["segment"])
+        if segment is None:
+            segment = self._files[entry["segment"]] = open(os.path.join(self.directory, entry["segment"]), "rb")
+        segment.seek(entry["offset"])
+        return gzip.decompress(segment.read(entry["length"])).decode("utf-8")
+
+    def close(self):
+        for segment in self._files.values():
+            segment.close()
+        self._files.clear()
@@ -0,0 +1,64 @@
+import importlib.util
+import os
+
+# Configuration
+HTML_PARSER = os.environ.get("HTML_PARSER", "auto")  # "auto", "lxml" ou "html.parser"
+BACKENDS = ["lxml", "html.parser"]  # Par ordre de préférence pour "auto"
+
+# Sections utiles des pages, pour une analyse ciblée (le reste du document n'est pas construit) :
+# (balise, attributs) d'un SoupStrainer
+PAGINATION = ("span", {"id": "pagination_last"})
+HISTORIQUE = ("div", {"id": "historique"})
+IDENTITY_INFO = ("div", {"class": "identityInfo"})
+
+
+def is_available(name):
+    """
+    Indique si l'analyseur peut être utilisé (html.parser est toujours disponible).
+    """
+    return name == "html.parser" or importlib.util.find_spec(name) is not None
+
+
+def select_backend(name="auto"):
+    """
+    Renvoie l'analyseur à utiliser : le premier disponible pour "auto", sinon celui demandé.
+    """
+    if name == "auto":
+        return next(backend for backend in BACKENDS if is_available(backend))
+    if name not in BACKENDS or not is_available(name):
+        raise ValueError(f"Analyseur HTML indisponible : {name}")
+    return name
+
+
+backend = None  # Resolved from HTML_PARSER on first parse, so a bad value cannot break imports
+
+
+def get_backend():
+    """
+    Renvoie l'analyseur sélectionné, choisi d'après HTML_PARSER au premier appel ; un HTML_PARSER
+    invalide ou indisponible se replie sur html.parser avec un avertissement.
+    """
+    global backend
+    if backend is None:
+        try:
+            backend = select_backend(HTML_PARSER)
+        except ValueError as error:
+            print(f"{error} (HTML_PARSER) : utilisation de html.parser.")
+            backend = "html.parser"
+    return backend
+
+
+def set_backend(name):
+    global backend
+    backend = select_backend(name)
+
+
+def make_soup(html_content, parse_only=None):
+    """
+    Analyse le HTML avec l'analyseur sélectionné ; `parse_only` limite l'arbre aux sections voulues.
+    """
+    # bs4 and its parser backend are only imported when a page is parsed, so commands that
+    # never parse HTML (--audit, conversions, merge) start without them
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    return BeautifulSoup(html_content, get_backend(), parse_only=SoupStrainer(*parse_only) if parse_only else None)
@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import rate_control
+
+# Configuration
+POOL_CONNECTIONS = 4  # Nombre d'hôtes gardés en pool (infoterre, mineralinfo, ...)
+POOL_MAXSIZE = 16  # Connexions keep-alive conservées par hôte
+REQUEST_TIMEOUT = 30  # Secondes
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5  # Secondes
+BACKOFF_MAX = 30  # Secondes
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+stats = {"requests": 0, "retries": 0, "errors": 0, "bytes": 0}
+statuses = {}  # Réponses reçues par code HTTP
+
+
+def _create_session():
+    # requests is imported on the first request, so commands that never go online start faster
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+
+session = None  # Session partagée, créée à la première requête
+
+
+def get_session():
+    global session
+    with _session_lock:
+        if session is None:
+            session = _create_session()
+        return session
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        stats[key] += amount
+
+
+def _count_response(response):
+    with _stats_lock:
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        stats["bytes"] += len(response.content)
+
+
+def backoff_delay(attempt):
+    """
+    Délai avant la tentative suivante : exponentiel, plafonné, avec gigue aléatoire.
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, **kwargs):
+    """
+    Envoie une requête via la session partagée, en réessayant sur les erreurs 429/5xx et les timeouts.
+    Le nombre de requêtes simultanées par hôte est réglé par son contrôleur de débit adaptatif.
+    Renvoie la dernière réponse obtenue ; relève l'exception si toutes les tentatives échouent.
+    """
+    import requests
+
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    shared_session = get_session()
+    controller = rate_control.controller_for(urlparse(url).netloc)
+    for attempt in range(MAX_RETRIES + 1):
+        _count("requests")
+        controller.acquire()
+        start = time.monotonic()
+        try:
+            response = shared_session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            controller.release(time.monotonic() - start)
+            if attempt == MAX_RETRIES:
+                _count("errors")
+                raise
+        except Exception:
+            controller.release(time.monotonic() - start)
+            raise
+        else:
+            retry_after = rate_control.parse_retry_after(response.headers.get("Retry-After"))
+            controller.release(time.monotonic() - start, response.status_code, retry_after)
+            _count_response(response)
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            response.close()
+        _count("retries")
+        # The controller already holds every request to this host until Retry-After has elapsed
+        time.sleep(backoff_delay(attempt))
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def connections_opened():
+    """
+    Nombre de connexions TCP/TLS ouvertes (handshakes) par les pools de la session.
+    """
+    if session is None:
+        return 0
+    total = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+    return total
+
+
+def snapshot():
+    """
+    Copie des compteurs HTTP, dont les réponses par code HTTP.
+    """
+    with _stats_lock:
+        return dict(stats, statuses={str(status): count for status, count in statuses.items()})
+
+
+def format_stats():
+    """
+    Résumé des compteurs HTTP pour vérifier la réutilisation des connexions.
+    """
+    return (
+        f"HTTP : {stats['requests']} requêtes, {connections_opened()} connexions ouvertes, "
+        f"{stats['retries']} nouvelles tentatives, {stats['errors']} échecs réseau."
+    )
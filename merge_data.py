@@ -1,76 +1,172 @@
-import csv
-import os
+import hashlib
 import json
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import datetime
+
+import columnar
+import records_io
+
+RUN_TIMESTAMP = re.compile(r"(\d{8}_\d{6})")
+# Detailed exports only (BASE_FILE_NAME of export_details_data.py): listing-only exports
+# (--no-details, --basic) would replace enriched records with newer records without fiches
+EXPORT_FILE = re.compile(r"^details_results_\d{8}_\d{6}\.(?:nd)?json$")
+KEEP = "newest"  # Règle de dédoublonnage : "newest" ou "oldest"
+
+
+def run_timestamp(file_path: str) -> str:
+    """
+    Returns a sortable timestamp for the run that produced a file.
+
+    Uses the YYYYMMDD_HHMMSS suffix added by the export scripts, or the file's
+    modification time when the name has none.
+    """
+    match = RUN_TIMESTAMP.search(os.path.basename(file_path))
+    if match:
+        return match.group(1)
+    return datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y%m%d_%H%M%S")
+
+
+def is_export_file(file_name: str) -> bool:
+    """
+    Returns True for a timestamped detailed export
+    (details_results_YYYYMMDD_HHMMSS.json or .ndjson).
 
-def merge_json_files(input_folder: str, output_file: str):
+    Listing-only exports and the files derived from an export and written next to it
+    (statistics, basic dataset, ...) do not match.
     """
-    Merges all JSON files in the specified folder into a single JSON file.
+    return EXPORT_FILE.search(os.path.basename(file_name)) is not None
+
+
+def merge_json_files(input_folder: str, output_file: str, keep: str = "newest") -> dict:
+    """
+    Merges all timestamped detailed JSON and NDJSON exports in the specified folder into a single
+    NDJSON file, keeping one record per Identifiant.
+
+    Files are read oldest run first. Records are streamed into an on-disk SQLite index keyed
+    by Identifiant, so memory use stays bounded however many run files accumulate. Records
+    without an Identifiant are all kept.
 
     Args:
-        input_folder (str): The folder containing JSON files to merge.
-        output_file (str): The path for the merged JSON file.
+        input_folder (str): The folder containing JSON/NDJSON files to merge.
+        output_file (str): The path for the merged NDJSON file.
+        keep (str): "newest" to keep the record from the most recent run,
+            "oldest" to keep the first one seen.
+
+    Returns:
+        dict: Counts of records read, duplicates, conflicts (duplicates with different
+        content) and records written.
 
     Raises:
-        ValueError: If any JSON file contains invalid JSON.
+        ValueError: If any JSON file contains invalid JSON, or if `keep` is unknown.
     """
-    merged_data = []
+    if keep not in ("newest", "oldest"):
+        raise ValueError(f"Unknown keep rule: {keep}")
+
+    file_paths = [
+        os.path.join(input_folder, file_name)
+        for file_name in os.listdir(input_folder)
+        if is_export_file(file_name)  # Process only export files, not their derived files
+    ]
+    file_paths.sort(key=lambda path: (run_timestamp(path), path))
 
-    # Iterate through all files in the input folder
-    for file_name in os.listdir(input_folder):
-        if file_name.endswith('.json'):  # Process only JSON files
-            file_path = os.path.join(input_folder, file_name)
+    stats = {"read": 0, "duplicates": 0, "conflicts": 0, "written": 0}
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = sqlite3.connect(os.path.join(index_dir, "merge_index.sqlite"))
+        # position keeps the order in which each Identifiant was first seen
+        index.execute(
+            "CREATE TABLE records (position INTEGER PRIMARY KEY, identifiant TEXT UNIQUE, "
+            "digest TEXT NOT NULL, record TEXT NOT NULL)"
+        )
+        for file_path in file_paths:
             try:
-                with open(file_path, 'r', encoding='utf-8') as json_file:
-                    data = json.load(json_file)
-                    # Append the data to merged_data
-                    if isinstance(data, list):
-                        merged_data.extend(data)
-                    else:
-                        merged_data.append(data)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON in file {file_name}: {e}")
-
-    # Write the merged data to the output file
-    with open(output_file, 'w', encoding='utf-8') as output_json_file:
-        json.dump(merged_data, output_json_file, indent=4)
+                for record in records_io.iter_records(file_path):
+                    stats["read"] += 1
+                    text = json.dumps(record, ensure_ascii=False)
+                    digest = hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+                    identifiant = record.get("Identifiant")
+                    existing = None
+                    if identifiant is not None:
+                        existing = index.execute(
+                            "SELECT digest FROM records WHERE identifiant = ?", (identifiant,)
+                        ).fetchone()
+                    if existing is None:
+                        index.execute(
+                            "INSERT INTO records (identifiant, digest, record) VALUES (?, ?, ?)",
+                            (identifiant, digest, text),
+                        )
+                        continue
+                    stats["duplicates"] += 1
+                    if existing[0] != digest:
+                        stats["conflicts"] += 1
+                        if keep == "newest":
+                            index.execute(
+                                "UPDATE records SET digest = ?, record = ? WHERE identifiant = ?",
+                                (digest, text, identifiant),
+                            )
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON in file {os.path.basename(file_path)}: {e}")
+        index.commit()
+
+        with open(output_file, 'w', encoding='utf-8') as output_ndjson_file:
+            for (text,) in index.execute("SELECT record FROM records ORDER BY position"):
+                output_ndjson_file.write(text + "\n")
+                stats["written"] += 1
+        index.close()
 
     print(f"All JSON files have been merged into {output_file}")
+    print(
+        f"{stats['read']} records read, {stats['duplicates']} duplicate Identifiant "
+        f"({stats['conflicts']} with conflicting content, {keep} kept), {stats['written']} records written."
+    )
+    return stats
 
 def convert_json_to_csv(json_filename, csv_filename):
     """
-    Convertit les données d'un fichier JSON en fichier CSV.
+    Convertit les données d'un fichier JSON ou NDJSON en fichier CSV, en mémoire constante.
     """
     try:
-        with open(json_filename, "r", encoding="utf-8") as json_file:
-            data = json.load(json_file)
-
-        if not data:
+        # Header collected in a first streaming pass, keys sorted for consistent order
+        if not records_io.convert_to_csv(json_filename, csv_filename):
             print("Aucune donnée à convertir en CSV.")
             return
 
-        # Collect all unique keys
-        all_fieldnames = set()
-        for result in data:
-            all_fieldnames.update(result.keys())
-
-        # Write to CSV
-        with open(csv_filename, "w", encoding="utf-8", newline="") as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=sorted(all_fieldnames))  # Sort keys for consistent order
-            writer.writeheader()
-            writer.writerows(data)
-
         print(f"Résultats convertis en CSV et sauvegardés dans {csv_filename}.")
     except Exception as e:
         print(f"Erreur lors de la conversion JSON -> CSV : {e}")
 
 
+def convert_json_to_parquet(json_filename: str, parquet_filename: str) -> None:
+    """
+    Converts a JSON or NDJSON file to a typed Parquet file, if pyarrow is installed.
+
+    Args:
+        json_filename (str): The JSON/NDJSON file to convert.
+        parquet_filename (str): The path for the Parquet file.
+    """
+    if not columnar.is_available():
+        print("pyarrow non installé : conversion Parquet ignorée.")
+        return
+    try:
+        if not columnar.convert_to_parquet(json_filename, parquet_filename):
+            print("Aucune donnée à convertir en Parquet.")
+            return
+
+        print(f"Résultats convertis en Parquet et sauvegardés dans {parquet_filename}.")
+    except Exception as e:
+        print(f"Erreur lors de la conversion JSON -> Parquet : {e}")
+
+
 # Main
 if __name__ == "__main__":
     input_folder = "output"
-    output_file = "merged_data.json"
+    output_file = "merged_data.ndjson"
     try:
-        merge_json_files(input_folder, output_file)
-        convert_json_to_csv('merged_data.json', 'merged_data.csv')
+        merge_json_files(input_folder, output_file, keep=KEEP)
+        convert_json_to_csv(output_file, 'merged_data.csv')
+        convert_json_to_parquet(output_file, 'merged_data.parquet')
     except ValueError as ve:
         print(f"Error: {ve}")
     except Exception as e:
@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_client
+import rate_control
+
+# Configuration
+REPORT_INTERVAL = 10  # Secondes entre deux lignes de progression / écritures du fichier de statistiques
+PREFIX = "infoterre_export"
+
+
+def snapshot(stage_stats, progress):
+    """
+    État courant de l'export (progression, étages, HTTP, hôtes), sérialisable en JSON.
+    `progress` contient pages_total, pages_done, records et started_at (time.monotonic()
+    au début du parcours des pages).
+    """
+    now = time.monotonic()
+    pages_done = progress.get("pages_done", 0)
+    pages_total = progress.get("pages_total", 0)
+    crawl_elapsed = now - progress.get("started_at", stage_stats.started_at)
+    rate = pages_done / crawl_elapsed if crawl_elapsed > 0 else 0
+    eta = (pages_total - pages_done) / rate if rate and pages_total else None
+    counters = {key: value for key, value in progress.items() if key != "started_at"}
+    return {
+        "time": time.time(),
+        "elapsed_seconds": now - stage_stats.started_at,
+        "progress": dict(counters, pages_per_second=rate, eta_seconds=eta),
+        "stages": stage_stats.snapshot(),
+        "http": http_client.snapshot(),
+        "hosts": rate_control.snapshot(),
+    }
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min" if hours else f"{minutes} min {seconds:02d} s"
+
+
+def format_progress(state):
+    """
+    Ligne de progression : pages traitées, débit et temps restant estimé.
+    """
+    progress = state["progress"]
+    pages_total = progress.get("pages_total") or 0
+    percent = progress.get("pages_done", 0) / pages_total * 100 if pages_total else 0
+    eta = format_duration(progress["eta_seconds"]) if progress["eta_seconds"] is not None else "inconnue"
+    return (
+        f"Progression : {progress.get('pages_done', 0)}/{pages_total} pages ({percent:.1f}%), "
+        f"{progress.get('records', 0)} résultats, {progress['pages_per_second']:.2f} pages/s, "
+        f"{state['http']['bytes'] / 1024 ** 2:.1f} Mo reçus, fin estimée dans {eta}."
+    )
+
+
+def write_json(filename, state):
+    """
+    Écrit l'état dans un fichier JSON, de façon atomique pour les lecteurs concurrents.
+    """
+    temporary = f"{filename}.tmp"
+    with open(temporary, "w", encoding="utf-8") as stats_file:
+        json.dump(state, stats_file, ensure_ascii=False, indent=2)
+    os.replace(temporary, filename)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def format_prometheus(state):
+    """
+    État au format texte d'exposition Prometheus.
+    """
+    lines = []
+
+    def metric(name, kind, samples):
+        lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_label(label)}"' for key, label in labels.items())
+            lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}")
+
+    progress = state["progress"]
+    metric("pages_total", "gauge", [({}, progress.get("pages_total", 0))])
+    metric("pages_done", "gauge", [({}, progress.get("pages_done", 0))])
+    metric("records_written", "gauge", [({}, progress.get("records", 0))])
+    if progress["eta_seconds"] is not None:
+        metric("eta_seconds", "gauge", [({}, progress["eta_seconds"])])
+
+    stages = state["stages"]
+    metric("stage_items_total", "counter", [({"stage": stage}, values["items"]) for stage, values in stages.items()])
+    metric("stage_errors_total", "counter", [({"stage": stage}, values["errors"]) for stage, values in stages.items()])
+    lines.append(f"# TYPE {PREFIX}_stage_duration_seconds histogram")
+    for stage, values in stages.items():
+        histogram = values["duration"]
+        cumulative = 0
+        for bound, count in zip(histogram["buckets"] + ["+Inf"], histogram["counts"]):
+            cumulative += count
+            lines.append(f'{PREFIX}_stage_duration_seconds_bucket{{stage="{_label(stage)}",le="{bound}"}} {cumulative}')
+        lines.append(f'{PREFIX}_stage_duration_seconds_sum{{stage="{_label(stage)}"}} {histogram["sum"]}')
+        lines.append(f'{PREFIX}_stage_duration_seconds_count{{stage="{_label(stage)}"}} {histogram["count"]}')
+
+    http = state["http"]
+    metric("http_requests_total", "counter", [({}, http["requests"])])
+    metric("http_retries_total", "counter", [({}, http["retries"])])
+    metric("http_network_errors_total", "counter", [({}, http["errors"])])
+    metric("http_received_bytes_total", "counter", [({}, http["bytes"])])
+    metric("http_responses_total", "counter", [({"status": status}, count) for status, count in http["statuses"].items()])
+    metric("host_concurrency_limit", "gauge", [({"host": host}, values["limit"]) for host, values in state["hosts"].items()])
+    metric("host_in_flight", "gauge", [({"host": host}, values["in_flight"]) for host, values in state["hosts"].items()])
+    return "\n".join(lines) + "\n"
+
+
+def serve(port, get_state):
+    """
+    Expose l'état au format Prometheus sur http://0.0.0.0:port/metrics, dans un thread en arrière-plan.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            payload = format_prometheus(get_state()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Métriques Prometheus exposées sur http://0.0.0.0:{port}/metrics")
+    return server
+
+
+class Reporter:
+    """
+    Thread qui, toutes les `interval` secondes, affiche la ligne de progression et réécrit
+    le fichier de statistiques JSON (s'il y en a un). Utilisable comme gestionnaire de contexte.
+    """
+
+    def __init__(self, get_state, filename=None, interval=REPORT_INTERVAL):
+        self.get_state = get_state
+        self.filename = filename
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def report(self):
+        state = self.get_state()
+        print(format_progress(state))
+        if self.filename:
+            write_json(self.filename, state)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.report()
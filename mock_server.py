@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from xml.sax.saxutils import escape
+
+# Configuration
+PORT = 8000
+PAGE_SIZE = 10
+RECORDS_FILE = "output/details_results_20241122_163223.json"
+LATENCY = float(os.environ.get("MOCK_LATENCY", 0))  # Secondes ajoutées à chaque réponse
+ERROR_RATE = float(os.environ.get("MOCK_ERROR_RATE", 0))  # Proportion de réponses 503
+MAX_CONCURRENCY = int(os.environ.get("MOCK_MAX_CONCURRENCY", 0))  # Au-delà : 429 + Retry-After (0 = illimité)
+RETRY_AFTER = 1  # Secondes annoncées dans les réponses 429
+SESSION_TTL = float(os.environ.get("MOCK_SESSION_TTL", 0))  # Durée de vie d'une session de recherche (0 = illimitée)
+PAGES = int(os.environ.get("MOCK_PAGES", 0))  # Nombre de pages annoncé, en réutilisant les pages en boucle (0 = selon les données)
+FIXTURES_DIR = os.environ.get("MOCK_FIXTURES")  # Pages enregistrées par benchmarks/record_fixtures.py
+
+LISTING_FIELDS = ["Identifiant", "Numéro S3IC", "Commune"]
+ADDITIONAL_FIELDS = [
+    "Site en activité", "Exploitation en eau", "Substances", "Produits",
+    "Longitude", "Latitude", "Date de fin d'autorisation",
+]
+
+
+def load_records(filename=RECORDS_FILE):
+    """
+    Charge les enregistrements servant de jeu de données au serveur simulé.
+    """
+    with open(filename, "r", encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def load_fixtures(directory):
+    """
+    Charge les pages enregistrées : les pages de résultats (pagine_NNNN.html) dans l'ordre
+    et les fiches (carmat_ID.html) par ID carmat.
+    """
+    listing_pages = []
+    details_pages = {}
+    for filename in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, filename), "r", encoding="utf-8") as html_file:
+            if re.match(r"^pagine_\d+\.html$", filename):
+                listing_pages.append(html_file.read())
+            elif re.match(r"^carmat_\w+\.html$", filename):
+                details_pages[filename[len("carmat_"):-len(".html")]] = html_file.read()
+    return listing_pages, details_pages
+
+
+def set_max_pages(html_content, max_pages):
+    """
+    Remplace le nombre de pages annoncé par le lien pagination_last d'une page enregistrée.
+    """
+    return re.sub(
+        r"<span[^>]*pagination_last[^>]*>",
+        lambda match: re.sub(r"(value\s*=\s*')\d+", rf"\g<1>{max_pages}", match.group(0)),
+        html_content, count=1,
+    )
+
+
+def render_field(label, value):
+    """
+    Produit un couple label/valeur au format des pages de résultats InfoTerre.
+    """
+    if value is None:
+        return ""
+    return (
+        f'<font class="results_item_field_label">{escape(label)} : </font>'
+        f'<font class="results_item_field_value">{escape(str(value))}</font><br/>'
+    )
+
+
+def render_listing_page(records, page_number, max_pages):
+    """
+    Génère le HTML d'une page pagine.htm à partir des enregistrements.
+    """
+    start = (page_number - 1) * PAGE_SIZE
+    rows = []
+    for record in records[start:start + PAGE_SIZE]:
+        row_id = f"carmat{record['Identifiant']}"
+        main_fields = "".join(render_field(label, record.get(label)) for label in LISTING_FIELDS)
+        additional_fields = "".join(render_field(label, record.get(label)) for label in ADDITIONAL_FIELDS)
+        rows.append(
+            f'<tr class="results_item"><td><a id="chkItem_{row_id}" href="#"></a></td>'
+            f"<td>{main_fields}</td></tr>"
+            f'<tr id="results_item_additional_content_{row_id}_null"><td colspan="2">{additional_fields}</td></tr>'
+        )
+    return (
+        "<html><body>"
+        f"<span id=\"pagination_last\" onclick=\"document.forms[0].page.value='{max_pages}';\">&gt;&gt;</span>"
+        f"<table>{''.join(rows)}</table>"
+        "</body></html>"
+    )
+
+
+def render_details_page(record):
+    """
+    Génère le HTML d'une fiche mineralinfo /Fiches/carmat/{id}.
+    """
+    identity = f"<p><strong>Nom</strong> : {escape(record.get('Nom') or '')}</p>"
+    if record.get("Exploitée par"):
+        identity += f"<p><strong>Exploitée par</strong> : {escape(record['Exploitée par'])}</p>"
+
+    history = ""
+    if record.get("Date début validité"):
+        cells = [
+            "1",
+            record.get("Type") or "",
+            record["Date début validité"][:10],
+            (record.get("Date fin validité") or "")[:10],
+            record.get("Volume total (kt)") or "",
+            record.get("Volume total (m³)") or "",
+        ]
+        history = "<tr>" + "".join(f"<td>{escape(cell)}</td>" for cell in cells) + "</tr>"
+
+    return (
+        "<html><body>"
+        f'<div class="identityInfo">{identity}</div>'
+        '<div id="historique"><table class="table table-bordered">'
+        "<tr><th>N°</th><th>Type</th><th>Début</th><th>Fin</th><th>kt</th><th>m³</th></tr>"
+        f"{history}</table></div>"
+        "</body></html>"
+    )
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Répond aux URL utilisées par les scripts d'export avec des pages générées.
+    """
+    protocol_version = "HTTP/1.1"  # Keep-alive, comme les serveurs réels
+    records = []
+    records_by_id = {}
+    latency = 0
+    error_rate = 0
+    max_concurrency = 0
+    in_flight = 0
+    in_flight_lock = threading.Lock()
+    session_ttl = 0
+    pages = 0
+    listing_fixtures = []
+    details_fixtures = {}
+    sessions = {}  # JSESSIONID -> date de création
+
+    def handle_with_injection(self, route):
+        """
+        Applique la latence, les erreurs 503 et la limite de concurrence (429) avant de router la requête.
+        """
+        cls = type(self)
+        with cls.in_flight_lock:
+            cls.in_flight += 1
+            overloaded = cls.max_concurrency and cls.in_flight > cls.max_concurrency
+        try:
+            if cls.latency:
+                time.sleep(cls.latency)
+            if overloaded or (cls.error_rate and random.random() < cls.error_rate):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                headers = {"Retry-After": str(RETRY_AFTER)} if overloaded else None
+                self.send_html("<html><body>Erreur simulée</body></html>", status=429 if overloaded else 503,
+                               headers=headers)
+            else:
+                route()
+        finally:
+            with cls.in_flight_lock:
+                cls.in_flight -= 1
+
+    def send_html(self, body, status=200, headers=None):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def session_id(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return cookie["JSESSIONID"].value if "JSESSIONID" in cookie else None
+
+    def session_expired(self):
+        """
+        Une session inconnue ou plus vieille que session_ttl n'a plus accès aux pages de résultats.
+        """
+        if not self.session_ttl:
+            return False
+        created = self.sessions.get(self.session_id())
+        return created is None or time.monotonic() - created > self.session_ttl
+
+    def do_GET(self):
+        self.handle_with_injection(self.route_get)
+
+    def do_POST(self):
+        self.handle_with_injection(self.route_post)
+
+    def route_get(self):
+        match = re.match(r"^/Fiches/carmat/(\w+)$", self.path)
+        if match:
+            body = self.details_fixtures.get(match.group(1))
+            record = self.records_by_id.get(match.group(1))
+            if body is None and record is not None:
+                body = render_details_page(record)
+            if body is None:
+                self.send_html("<html><body>Not found</body></html>", status=404)
+            else:
+                etag = '"%s"' % hashlib.md5(body.encode("utf-8")).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    self.send_html(body, headers={"ETag": etag})
+        elif self.path.startswith("/rechercher/"):
+            headers = None
+            if self.session_id() not in self.sessions:
+                session_id = uuid.uuid4().hex.upper()
+                self.sessions[session_id] = time.monotonic()
+                headers = {"Set-Cookie": f"JSESSIONID={session_id}; Path=/"}
+            self.send_html("<html><body></body></html>", headers=headers)
+        else:
+            self.send_html("<html><body>Not found</body></html>", status=404)
+
+    def route_post(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if self.path.startswith("/rechercher/pagine.htm"):
+            if self.session_expired():
+                self.send_html("<html><body></body></html>", status=302, headers={"Location": "/rechercher/"})
+                return
+            available = len(self.listing_fixtures) or max(1, -(-len(self.records) // PAGE_SIZE))
+            max_pages = self.pages or available
+            page_number = int(form.get("page", ["1"])[0])
+            if page_number > max_pages:
+                self.send_html("<html><body>Not found</body></html>", status=404)
+                return
+            # Beyond the available data, pages are served again in a loop
+            page_number = (page_number - 1) % available + 1
+            if self.listing_fixtures:
+                self.send_html(set_max_pages(self.listing_fixtures[page_number - 1], max_pages))
+            else:
+                self.send_html(render_listing_page(self.records, page_number, max_pages))
+        elif self.path.startswith("/rechercher/"):
+            self.send_html("<html><body></body></html>")
+        else:
+            self.send_html("<html><body>Not found</body></html>", status=404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(records, port=PORT, latency=LATENCY, error_rate=ERROR_RATE, max_concurrency=MAX_CONCURRENCY,
+                  session_ttl=SESSION_TTL, pages=PAGES, fixtures=None):
+    """
+    Crée un serveur simulé servant les enregistrements fournis, avec une latence, un taux
+    d'erreurs 503, une limite de requêtes simultanées (réponses 429), une durée de vie des
+    sessions de recherche (redirection 302 une fois expirées) et un nombre de pages configurables.
+    `fixtures` (résultat de load_fixtures) remplace les pages générées par des pages enregistrées.
+    """
+    listing_fixtures, details_fixtures = fixtures or ([], {})
+    handler = type("Handler", (MockHandler,), {
+        "records": records,
+        "records_by_id": {record["Identifiant"]: record for record in records},
+        "latency": latency,
+        "error_rate": error_rate,
+        "max_concurrency": max_concurrency,
+        "in_flight_lock": threading.Lock(),
+        "session_ttl": session_ttl,
+        "pages": pages,
+        "listing_fixtures": listing_fixtures,
+        "details_fixtures": details_fixtures,
+        "sessions": {},
+    })
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+# Main
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    fixtures = load_fixtures(FIXTURES_DIR) if FIXTURES_DIR else None
+    server = create_server(load_records(os.environ.get("MOCK_RECORDS", RECORDS_FILE)), port, fixtures=fixtures)
+    print(f"Serveur simulé InfoTerre/mineralinfo démarré sur http://127.0.0.1:{port}")
+    print(f"Lancer les exports avec INFOTERRE_URL=http://127.0.0.1:{port} MINERALINFO_URL=http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
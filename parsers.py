@@ -0,0 +1,206 @@
+import re
+from datetime import datetime
+
+import html_parsing
+
+# Configuration
+LISTING_FIELDS = ["Identifiant", "Numéro S3IC", "Commune"]
+ADDITIONAL_FIELDS = [
+    "Site en activité", "Exploitation en eau", "Substances", "Produits",
+    "Longitude", "Latitude", "Date de fin d'autorisation",
+]
+DETAILS_FIELDS = [
+    "Type", "Date début validité", "Date fin validité",
+    "Volume total (kt)", "Volume total (m³)", "Nom", "Exploitée par",
+]
+ADDITIONAL_ROW_ID = re.compile(r"^results_item_additional_content_(.+)_null$")
+
+
+def get_max_pages(html_content):
+    """
+    Récupère le nombre maximum de pages à partir du contenu HTML.
+    """
+    soup = html_parsing.make_soup(html_content, parse_only=html_parsing.PAGINATION)
+    pagination_element = soup.find("span", id="pagination_last")
+    if pagination_element:
+        match = re.search(r"value\s*=\s*'(\d+)'", pagination_element.get("onclick", ""))
+        if match:
+            return int(match.group(1))
+    print("Nombre maximum de pages introuvable, valeur par défaut utilisée (1).")
+    return 1
+
+
+def extract_field(tr_element, label):
+    """
+    Récupère la valeur d'un champ dans un <tr> en fonction du label fourni.
+    """
+    field = tr_element.find("font", text=lambda t: t and label in t)
+    if field and field.find_next_sibling("font", class_="results_item_field_value"):
+        return field.find_next_sibling("font", class_="results_item_field_value").text.strip()
+    return None
+
+
+def extract_fields(tr_element, labels):
+    """
+    Récupère en un seul parcours du <tr> les valeurs de plusieurs champs.
+    Donne le même résultat que extract_field appelé pour chaque label.
+    """
+    fields = dict.fromkeys(labels)
+    pending = list(labels)
+    for font in tr_element.find_all("font"):
+        text = font.string
+        if not text:
+            continue
+        for label in [label for label in pending if label in text]:
+            pending.remove(label)
+            value = font.find_next_sibling("font", class_="results_item_field_value")
+            fields[label] = value.text.strip() if value else None
+        if not pending:
+            break
+    return fields
+
+
+def index_rows(soup):
+    """
+    Parcourt une seule fois les <tr> de la page et renvoie les lignes principales
+    ainsi que l'index des lignes additionnelles par ID de ligne.
+    """
+    main_rows = []
+    additional_rows = {}
+    for tr in soup.find_all("tr"):
+        if "results_item" in tr.get("class", []):
+            main_rows.append(tr)
+        match = ADDITIONAL_ROW_ID.match(tr.get("id", ""))
+        if match:
+            additional_rows.setdefault(match.group(1), tr)
+    return main_rows, additional_rows
+
+
+def extract_additional_data(additional_rows, row_id):
+    """
+    Récupère les données additionnelles pour une ligne spécifique, identifiée par son ID,
+    à partir de l'index construit par index_rows.
+    """
+    additional_row = additional_rows.get(row_id)
+    if not additional_row:
+        return {}
+
+    return extract_fields(additional_row, ADDITIONAL_FIELDS)
+
+
+def parse_listing_page(html_content):
+    """
+    Analyse une page de résultats (sans accès réseau) : renvoie les résultats et les ID carmat.
+    """
+    soup = html_parsing.make_soup(html_content)
+    results = []
+    carmat_ids = []
+
+    main_rows, additional_rows = index_rows(soup)
+    for row in main_rows:
+        result = {}
+
+        id_element = row.find("a", {"id": lambda x: x and x.startswith("chkItem_")})
+        if id_element:
+            row_id = id_element["id"].split("_")[1]
+            result.update(extract_fields(row, LISTING_FIELDS))
+
+            additional_data = extract_additional_data(additional_rows, row_id)
+            result.update(additional_data)
+
+            results.append(result)
+            carmat_ids.append(row_id.strip('carmat'))
+
+    return results, carmat_ids
+
+
+def extract_most_recent_ap(html_content):
+    """
+    Extracts the most recent AP (Arrêté préfectoral) information from the given HTML content.
+    """
+    soup = html_parsing.make_soup(html_content, parse_only=html_parsing.HISTORIQUE)
+
+    historique_section = soup.find("div", id="historique")
+
+    if not historique_section:
+        print("Section 'historique' introuvable.")
+        return None
+
+    ap_table = historique_section.find("table", class_="table table-bordered")
+    if not ap_table:
+        print("Tableau AP introuvable dans la section 'historique'.")
+        return None
+
+    rows = ap_table.find_all("tr")[1:]  # Skip the header row
+    ap_data = []
+
+    for row in rows:
+        cols = row.find_all("td")
+        if len(cols) < 6:
+            continue
+
+        try:
+            ap_type = cols[1].text.strip()
+            start_date = datetime.strptime(cols[2].text.strip(), "%Y-%m-%d")
+            end_date = cols[3].text.strip()
+            end_date = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+            volume_kt = cols[4].text.strip() or None
+            volume_m3 = cols[5].text.strip() or None
+
+            ap_data.append({
+                "Type": ap_type,
+                "Date début validité": start_date,
+                "Date fin validité": end_date,
+                "Volume total (kt)": volume_kt,
+                "Volume total (m³)": volume_m3
+            })
+        except ValueError:
+            continue
+
+    if not ap_data:
+        return None
+
+    return max(ap_data, key=lambda x: x["Date début validité"])
+
+
+def extract_additional_parameters(details_html):
+    soup = html_parsing.make_soup(details_html, parse_only=html_parsing.IDENTITY_INFO)
+
+    # Locate the `identityInfo` div
+    identity_info = soup.find("div", class_="identityInfo")
+    if not identity_info:
+        print("No identityInfo div found.")
+        return "", ""
+
+    name = ""
+    exploited_by = ""
+
+    try:
+        # Find all <p> tags within identity_info and iterate over them
+        for p_tag in identity_info.find_all("p"):
+            # Clean the text from nested tags and spaces
+            text = p_tag.get_text(strip=True)
+            if "Nom" in text:
+                name = text.split(":")[1].strip()  # Extract text after ':'
+            elif "Exploitée par" in text:
+                exploited_by = text.split(":")[1].strip()  # Extract text after ':'
+    except Exception as e:
+        print("Error extracting parameters:", e)
+
+    return name, exploited_by
+
+
+def parse_details_page(details_html):
+    """
+    Extrait d'une fiche mineralinfo l'AP le plus récent, le nom et l'exploitant (sans accès réseau).
+    """
+    details = {}
+    recent_ap = extract_most_recent_ap(details_html)
+    name, exploited_by = extract_additional_parameters(details_html)
+    if recent_ap:
+        details.update(recent_ap)
+    if name:
+        details["Nom"] = name
+    if exploited_by:
+        details["Exploitée par"] = exploited_by
+    return details
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Secondes
+
+
+def ordered_window(submit, items, size):
+    """
+    Soumet les éléments au fil de l'eau avec `submit` (qui renvoie un Future), sans jamais
+    en avoir plus de `size` en cours, et renvoie les couples (élément, résultat) dans l'ordre.
+
+    Tant que le consommateur n'a pas repris le résultat le plus ancien, aucun nouvel élément
+    n'est soumis : un étage lent en aval freine ainsi les étages en amont.
+    """
+    pending = deque()
+    for item in items:
+        pending.append((item, submit(item)))
+        if len(pending) >= size:
+            item, future = pending.popleft()
+            yield item, future.result()
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
+
+
+def run_in_pool(pool, function, *args):
+    """
+    Exécute la fonction dans le pool de processus s'il y en a un, sinon dans le thread courant.
+    """
+    if pool is None:
+        return function(*args)
+    return pool.submit(function, *args).result()
+
+
+class Histogram:
+    """
+    Histogramme de durées à seuils fixes (LATENCY_BUCKETS), non cumulatif.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: above the highest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+class StageStats:
+    """
+    Compteurs par étage du pipeline : éléments traités, temps cumulé passé dans l'étage,
+    histogramme des durées de chaque passage et nombre de passages interrompus par une exception.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.counts = dict.fromkeys(self.stages, 0)
+        self.busy = dict.fromkeys(self.stages, 0.0)
+        self.errors = dict.fromkeys(self.stages, 0)
+        self.histograms = {stage: Histogram() for stage in self.stages}
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage, items=1):
+        start = time.monotonic()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.counts[stage] += items
+                self.busy[stage] += elapsed
+                self.errors[stage] += failed
+                self.histograms[stage].observe(elapsed)
+
+    def snapshot(self):
+        """
+        État de chaque étage, sérialisable en JSON.
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "items": self.counts[stage],
+                    "busy_seconds": self.busy[stage],
+                    "errors": self.errors[stage],
+                    "duration": self.histograms[stage].snapshot(),
+                }
+                for stage in self.stages
+            }
+
+    def format(self):
+        """
+        Débit de chaque étage depuis le démarrage et temps moyen par élément.
+        """
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        parts = []
+        for stage in self.stages:
+            count = self.counts[stage]
+            average = self.busy[stage] / count * 1000 if count else 0
+            parts.append(f"{stage} {count / elapsed:.1f}/s ({average:.0f} ms)")
+        return "Débit : " + " | ".join(parts)
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# Configuration
+INITIAL_CONCURRENCY = 4  # Requêtes simultanées autorisées par hôte au démarrage
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16  # Ne pas dépasser la taille des pools de connexions
+LATENCY_TARGET = 2.0  # Secondes : au-delà, la réponse compte comme un signe de saturation
+DECREASE_FACTOR = 0.5
+DECREASE_INTERVAL = 1.0  # Secondes minimum entre deux réductions (une rafale d'erreurs = une réduction)
+RECOVERY_DELAY = 5.0  # Secondes sans augmentation après une réduction, pour ne pas resonder trop vite
+LATENCY_WINDOW = 1000  # Nombre de latences conservées pour les percentiles
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """
+    Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes d'attente, ou None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateController:
+    """
+    Limite adaptative du nombre de requêtes simultanées vers un hôte (AIMD).
+
+    Chaque réponse rapide et réussie, lorsque la limite est atteinte, l'augmente d'environ une
+    requête par « aller-retour » (+1/limite) ; une réponse 429/5xx, une erreur réseau ou une latence
+    supérieure à LATENCY_TARGET la divise par deux, puis la limite reste stable pendant
+    RECOVERY_DELAY. Un Retry-After suspend tout envoi vers l'hôte pendant la durée indiquée.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.limit = float(INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.decreases = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Attend qu'une place se libère sous la limite courante et que l'hôte ne soit plus en pause.
+        """
+        with self._condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, latency, status=None, retry_after=None):
+        """
+        Libère la place et ajuste la limite selon le résultat (`status` None pour une erreur réseau).
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            self.latencies.append(latency)
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if status is None or status in THROTTLE_STATUSES or latency > LATENCY_TARGET:
+                if now - self._last_decrease >= DECREASE_INTERVAL:
+                    self.limit = max(MIN_CONCURRENCY, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif now - self._last_decrease >= RECOVERY_DELAY and self.in_flight + 1 >= int(self.limit):
+                # Only grow while the current limit is actually in use
+                self.limit = min(MAX_CONCURRENCY, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def percentiles(self, points=(50, 90, 99)):
+        """
+        Percentiles des dernières latences observées, en secondes.
+        """
+        with self._condition:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        return {point: latencies[min(len(latencies) - 1, len(latencies) * point // 100)] for point in points}
+
+    def format(self):
+        percentiles = " ".join(f"p{point} {value * 1000:.0f} ms" for point, value in self.percentiles().items())
+        return f"{self.host} : limite {self.limit:.1f} ({self.decreases} réductions), {percentiles}"
+
+
+_controllers_lock = threading.Lock()
+controllers = {}
+
+
+def controller_for(host):
+    """
+    Renvoie le contrôleur associé à l'hôte, créé au premier appel.
+    """
+    with _controllers_lock:
+        if host not in controllers:
+            controllers[host] = RateController(host)
+        return controllers[host]
+
+
+def snapshot():
+    """
+    Limite, requêtes en cours et percentiles de latence de chaque hôte contacté.
+    """
+    with _controllers_lock:
+        current = list(controllers.values())
+    return {
+        controller.host: {
+            "limit": controller.limit,
+            "in_flight": controller.in_flight,
+            "latency_percentiles": controller.percentiles(),
+        }
+        for controller in current
+    }
+
+
+def format_limits():
+    """
+    Limites courantes et percentiles de latence de chaque hôte contacté.
+    """
+    with _controllers_lock:
+        current = list(controllers.values())
+    return "\n".join(controller.format() for controller in current)
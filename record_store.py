@@ -0,0 +1,208 @@
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import sys
+import time
+
+import columnar
+from compact_records import iter_compact
+from merge_data import run_timestamp
+
+# Configuration
+STORE_FILE = "output/carrieres.sqlite"
+BATCH_SIZE = 5000  # Enregistrements insérés par transaction
+WORD_FIELDS = {"substances": "Substances", "produits": "Produits"}  # Listes libres, indexées mot par mot
+
+COLUMNS = {
+    # colonne: (champ de l'enregistrement, conversion)
+    "commune": ("Commune", columnar.parse_string),
+    "substances": ("Substances", columnar.parse_string),
+    "produits": ("Produits", columnar.parse_string),
+    "site_actif": ("Site en activité", columnar.parse_bool),
+    "fin_autorisation": ("Date de fin d'autorisation", columnar.parse_year),
+    "longitude": ("Longitude", columnar.parse_float),
+    "latitude": ("Latitude", columnar.parse_float),
+}
+
+
+def words(value):
+    """
+    Mots distincts d'un champ texte, en minuscules.
+    """
+    return sorted(set(re.findall(r"\w+", value.lower()))) if value else []
+
+
+def like_prefix(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class RecordStore:
+    """
+    Base SQLite des carrières : un enregistrement par Identifiant, mis à jour par upsert.
+
+    Les champs interrogés sont extraits et typés dans des colonnes indexées (commune insensible
+    à la casse, site en activité, année de fin d'autorisation) ; les substances et produits,
+    qui peuvent en citer plusieurs ("Voirie, Granulat alluvionnaire"), sont indexés mot par mot
+    et les coordonnées dans un R-tree. L'enregistrement complet est conservé en JSON.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS carrieres (
+                id INTEGER PRIMARY KEY,
+                identifiant TEXT NOT NULL UNIQUE,
+                commune TEXT COLLATE NOCASE,
+                substances TEXT COLLATE NOCASE,
+                produits TEXT COLLATE NOCASE,
+                site_actif INTEGER,
+                fin_autorisation INTEGER,
+                longitude REAL,
+                latitude REAL,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS carrieres_commune ON carrieres (commune);
+            CREATE INDEX IF NOT EXISTS carrieres_site_actif ON carrieres (site_actif);
+            CREATE INDEX IF NOT EXISTS carrieres_fin_autorisation ON carrieres (fin_autorisation);
+            CREATE TABLE IF NOT EXISTS carrieres_mots (id INTEGER NOT NULL, champ TEXT NOT NULL, mot TEXT COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS carrieres_mots_mot ON carrieres_mots (champ, mot);
+            CREATE INDEX IF NOT EXISTS carrieres_mots_id ON carrieres_mots (id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS carrieres_position USING rtree (id, min_lon, max_lon, min_lat, max_lat);
+        """)
+
+    def upsert(self, records):
+        """
+        Insère ou remplace les enregistrements (dicts ou CompactRecord, par Identifiant), en une transaction.
+        Renvoie le nombre d'enregistrements traités.
+        """
+        count = 0
+        with self._db:
+            for record in records:
+                values = {column: convert(record.get(field)) for column, (field, convert) in COLUMNS.items()}
+                self._db.execute(
+                    f"INSERT INTO carrieres (identifiant, {', '.join(COLUMNS)}, record) "
+                    f"VALUES (?, {', '.join('?' * len(COLUMNS))}, ?) "
+                    f"ON CONFLICT (identifiant) DO UPDATE SET "
+                    f"{', '.join(f'{column} = excluded.{column}' for column in COLUMNS)}, record = excluded.record",
+                    (record["Identifiant"], *values.values(), json.dumps(dict(record), ensure_ascii=False)),
+                )
+                row_id = self._db.execute(
+                    "SELECT id FROM carrieres WHERE identifiant = ?", (record["Identifiant"],)
+                ).fetchone()[0]
+                self._db.execute("DELETE FROM carrieres_mots WHERE id = ?", (row_id,))
+                self._db.executemany(
+                    "INSERT INTO carrieres_mots VALUES (?, ?, ?)",
+                    [(row_id, column, word) for column in WORD_FIELDS for word in words(values[column])],
+                )
+                self._db.execute("DELETE FROM carrieres_position WHERE id = ?", (row_id,))
+                if values["longitude"] is not None and values["latitude"] is not None:
+                    self._db.execute(
+                        "INSERT INTO carrieres_position VALUES (?, ?, ?, ?, ?)",
+                        (row_id, values["longitude"], values["longitude"], values["latitude"], values["latitude"]),
+                    )
+                count += 1
+        return count
+
+    def import_file(self, filename):
+        """
+        Importe un fichier NDJSON ou JSON par lots de CompactRecord, sans le charger en mémoire.
+        """
+        return sum(self.upsert(batch) for batch in columnar.iter_batches(iter_compact(filename), BATCH_SIZE))
+
+    def query(self, commune=None, substance=None, produit=None, active=None, authorised_until=None, bbox=None,
+              limit=None):
+        """
+        Renvoie les enregistrements correspondant à tous les critères fournis :
+        commune par préfixe insensible à la casse, substance et produit dont chaque mot commence
+        un mot du champ ("granulat" trouve "Voirie, Granulat alluvionnaire"), site en activité
+        (booléen), autorisation valable au moins jusqu'à l'année `authorised_until`, et `bbox`
+        (lon_min, lat_min, lon_max, lat_max).
+        """
+        conditions = []
+        parameters = []
+        # Prefix LIKE on a NOCASE column can use its index
+        if commune:
+            conditions.append("commune LIKE ? ESCAPE '\\'")
+            parameters.append(like_prefix(commune))
+        for column, value in [("substances", substance), ("produits", produit)]:
+            for word in words(value):
+                conditions.append("id IN (SELECT id FROM carrieres_mots WHERE champ = ? AND mot LIKE ? ESCAPE '\\')")
+                parameters += [column, like_prefix(word)]
+        if active is not None:
+            conditions.append("site_actif = ?")
+            parameters.append(int(active))
+        if authorised_until is not None:
+            conditions.append("fin_autorisation >= ?")
+            parameters.append(authorised_until)
+        if bbox is not None:
+            conditions.append(
+                "id IN (SELECT id FROM carrieres_position "
+                "WHERE min_lon >= ? AND max_lon <= ? AND min_lat >= ? AND max_lat <= ?)"
+            )
+            min_lon, min_lat, max_lon, max_lat = bbox
+            parameters += [min_lon, max_lon, min_lat, max_lat]
+
+        sql = "SELECT record FROM carrieres"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY identifiant"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [json.loads(row[0]) for row in self._db.execute(sql, parameters)]
+
+    def count(self):
+        return self._db.execute("SELECT COUNT(*) FROM carrieres").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+# Main
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Base SQLite indexée des carrières exportées.")
+    parser.add_argument("--db", default=STORE_FILE, help=f"base SQLite (défaut {STORE_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="importer des exports JSON/NDJSON (upsert par Identifiant)")
+    import_parser.add_argument("files", nargs="+")
+
+    query_parser = commands.add_parser("query", help="rechercher des carrières")
+    query_parser.add_argument("--commune")
+    query_parser.add_argument("--substance")
+    query_parser.add_argument("--produit")
+    query_parser.add_argument("--actif", dest="active", action="store_const", const=True, help="sites en activité")
+    query_parser.add_argument("--inactif", dest="active", action="store_const", const=False, help="sites arrêtés")
+    query_parser.add_argument("--autorise-jusqu-a", dest="authorised_until", type=int, metavar="ANNÉE",
+                              help="autorisation valable au moins jusqu'à cette année")
+    query_parser.add_argument("--bbox", nargs=4, type=float, metavar=("LON_MIN", "LAT_MIN", "LON_MAX", "LAT_MAX"))
+    query_parser.add_argument("--limit", type=int)
+    query_parser.add_argument("--csv", action="store_true", help="résultats en CSV plutôt qu'en NDJSON")
+    args = parser.parse_args()
+
+    store = RecordStore(args.db)
+    try:
+        if args.command == "import":
+            # Oldest run first, so the newest record of each Identifiant wins
+            for filename in sorted(args.files, key=run_timestamp):
+                start = time.monotonic()
+                count = store.import_file(filename)
+                print(f"{count} enregistrements importés depuis {filename} en {time.monotonic() - start:.1f} s.")
+            print(f"{store.count()} carrières dans {args.db}.")
+        else:
+            start = time.monotonic()
+            results = store.query(args.commune, args.substance, args.produit, args.active, args.authorised_until,
+                                  args.bbox, args.limit)
+            elapsed = time.monotonic() - start
+            if args.csv and results:
+                writer = csv.DictWriter(sys.stdout, fieldnames=sorted({key for record in results for key in record}))
+                writer.writeheader()
+                writer.writerows(results)
+            else:
+                for record in results:
+                    print(json.dumps(record, ensure_ascii=False))
+            print(f"{len(results)} résultats en {elapsed * 1000:.1f} ms.", file=sys.stderr)
+    finally:
+        store.close()
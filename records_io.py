@@ -0,0 +1,104 @@
+import csv
+import json
+import os
+
+CHUNK_SIZE = 1 << 16  # Caractères lus à la fois dans un tableau JSON
+
+
+class NdjsonWriter:
+    """
+    Écrit les enregistrements au fil de l'eau, un objet JSON par ligne (NDJSON), en ajout seul.
+    Avec mode="w", le fichier est vidé à l'ouverture.
+    """
+
+    def __init__(self, filename, default=None, mode="a"):
+        self.filename = filename
+        self.default = default
+        self._file = open(filename, mode, encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=self.default) + "\n")
+
+    def flush(self, sync=False):
+        """
+        Vide le tampon ; avec `sync`, attend que les données soient sur disque.
+        Renvoie la taille du fichier en octets.
+        """
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _iter_json_array(json_file):
+    decoder = json.JSONDecoder()
+    buffer = json_file.read(CHUNK_SIZE).lstrip()[1:]  # Skip the opening "["
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except ValueError:
+            chunk = json_file.read(CHUNK_SIZE)
+            if not chunk:
+                raise ValueError(f"JSON tronqué ou invalide dans {json_file.name}")
+            buffer += chunk
+            continue
+        yield record
+        buffer = buffer[end:]
+
+
+def iter_records(filename):
+    """
+    Parcourt les enregistrements d'un fichier NDJSON ou d'un tableau JSON sans le charger en mémoire.
+    """
+    with open(filename, "r", encoding="utf-8") as json_file:
+        first_char = json_file.read(CHUNK_SIZE).lstrip()[:1]
+        json_file.seek(0)
+        if first_char == "[":
+            yield from _iter_json_array(json_file)
+            return
+        for line in json_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def collect_fieldnames(filenames):
+    """
+    Premier passage peu coûteux : ensemble trié des clés présentes dans les fichiers.
+    """
+    fieldnames = set()
+    for filename in filenames:
+        for record in iter_records(filename):
+            fieldnames.update(record.keys())
+    return sorted(fieldnames)
+
+
+def convert_to_csv(json_filename, csv_filename, fieldnames=None):
+    """
+    Convertit un fichier NDJSON ou JSON en CSV en mémoire constante.
+    Sans `fieldnames`, l'en-tête est collecté par un premier passage (clés triées).
+    Renvoie le nombre de lignes écrites (0 sans créer de fichier s'il n'y a aucune donnée).
+    """
+    if fieldnames is None:
+        fieldnames = collect_fieldnames([json_filename])
+    if not fieldnames:
+        return 0
+    count = 0
+    with open(csv_filename, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        for record in iter_records(json_filename):
+            writer.writerow(record)
+            count += 1
+    return count
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+DEFAULT_TTL = 30 * 24 * 3600  # Secondes
+DEFAULT_MAX_SIZE = 1024 ** 3  # Octets (corps compressés)
+
+CacheEntry = namedtuple("CacheEntry", ["body", "etag", "last_modified", "fresh"])
+
+
+class ResponseCache:
+    """
+    Cache persistant des réponses HTTP, indexé par URL, stocké dans une base SQLite.
+
+    Les corps sont compressés avec zlib. Une entrée plus vieille que `ttl` n'est plus servie
+    directement mais peut être revalidée (ETag / Last-Modified). Quand la taille totale dépasse
+    `max_size`, les entrées les moins récemment utilisées sont supprimées ; la taille est relue
+    dans la base, que plusieurs processus (--worker) peuvent remplir en même temps.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)  # Shared by --worker processes
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, "
+            "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._db.commit()
+
+    def lookup(self, url):
+        """
+        Renvoie l'entrée en cache pour l'URL (fraîche ou non), ou None.
+        Une entrée fraîche compte comme un succès de cache.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            body, etag, last_modified, fetched_at = row
+            fresh = time.time() - fetched_at < self.ttl
+            if fresh:
+                self.stats["hits"] += 1
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+                self._db.commit()
+            return CacheEntry(zlib.decompress(body).decode("utf-8"), etag, last_modified, fresh)
+
+    @staticmethod
+    def conditional_headers(entry):
+        """
+        En-têtes de revalidation conditionnelle pour une entrée expirée.
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def revalidated(self, url):
+        """
+        Marque une entrée comme à nouveau fraîche après une réponse 304.
+        """
+        with self._lock:
+            now = time.time()
+            self.stats["revalidated"] += 1
+            self._db.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+
+    def store(self, url, body, headers):
+        """
+        Enregistre une réponse 200 et ses validateurs, puis applique la limite de taille.
+        Chaque téléchargement complet compte comme un échec de cache.
+        """
+        data = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self.stats["misses"] += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, data, len(data), headers.get("ETag"), headers.get("Last-Modified"), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """
+        Supprime les entrées les moins récemment utilisées tant que la base dépasse max_size.
+        Appelée dans la transaction d'écriture de store : aucun autre processus n'écrit entre-temps.
+        """
+        # Read from the database, not counted locally: other processes share it
+        total_size = self._db.execute("SELECT COALESCE(SUM(length(body)), 0) FROM responses").fetchone()[0]
+        while total_size > self.max_size:
+            row = self._db.execute("SELECT url, length(body) FROM responses ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM responses WHERE url = ?", (row[0],))
+            total_size -= row[1]
+            self.stats["evictions"] += 1
+
+    def format_stats(self):
+        """
+        Résumé des succès/échecs du cache pour la fin d'une exécution.
+        """
+        lookups = self.stats["hits"] + self.stats["revalidated"] + self.stats["misses"]
+        served = self.stats["hits"] + self.stats["revalidated"]
+        ratio = served / lookups * 100 if lookups else 0
+        return (
+            f"Cache : {self.stats['hits']} succès, {self.stats['revalidated']} revalidations (304), "
+            f"{self.stats['misses']} échecs, {self.stats['evictions']} évictions "
+            f"({ratio:.1f}% servis depuis le disque)."
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,68 @@
+import queue
+import threading
+
+# Configuration
+SESSION_RETRIES = 2  # Reconstructions de session tentées pour une même page
+
+
+class SessionExpired(Exception):
+    """
+    La session de recherche InfoTerre n'est plus valide (redirection, page sans résultats...).
+    """
+
+
+def looks_expired(html_content):
+    """
+    Une page de résultats valide contient la pagination et au moins une ligne de résultat.
+    """
+    return "pagination_last" not in html_content or "results_item" not in html_content
+
+
+class SessionPool:
+    """
+    Pool de sessions de recherche InfoTerre, chacune initialisée indépendamment par
+    `create_session` (qui renvoie les en-têtes HTTP de la session).
+
+    Chaque requête emprunte une session libre, ce qui répartit les pages entre les sessions ;
+    une session expirée est reconstruite de façon transparente et la page redemandée.
+    """
+
+    def __init__(self, create_session, size):
+        self.create_session = create_session
+        self.size = size
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(create_session())
+
+    def fetch(self, fetch_function, page_number):
+        """
+        Appelle fetch_function(page_number, headers) avec une session du pool.
+        Renvoie None si la page reste inaccessible après SESSION_RETRIES reconstructions, ou si
+        la session ne peut pas être reconstruite (erreur réseau, recherche refusée).
+        """
+        headers = self._idle.get()
+        try:
+            for attempt in range(SESSION_RETRIES + 1):
+                try:
+                    return fetch_function(page_number, headers)
+                except SessionExpired as e:
+                    print(f"Session expirée ({e}), reconstruction de la session.")
+                    if attempt == SESSION_RETRIES:
+                        print(f"Page {page_number} abandonnée après {SESSION_RETRIES} reconstructions de session.")
+                        return None
+                    try:
+                        headers = self.create_session()
+                    except Exception as e:
+                        # The page is committed as failed for --repair; the expired session stays
+                        # in the pool and is rebuilt again by the next page that uses it
+                        print(f"Reconstruction de session impossible ({e}) : page {page_number} abandonnée.")
+                        return None
+                    with self._lock:
+                        self.rebuilds += 1
+        finally:
+            self._idle.put(headers)
+
+    def format_stats(self):
+        return f"Sessions de recherche : {self.size} en parallèle, {self.rebuilds} reconstructions."
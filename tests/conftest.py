@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import mock_server
+import rate_control
+
+RECORDS_FILE = os.path.join(ROOT, "output", "details_results_20241122_201829.json")  # Export réel avec fiches
+RECORDS = 30  # Enregistrements servis par le serveur simulé : 3 pages de résultats
+
+
+@pytest.fixture(scope="session")
+def records():
+    """
+    Premiers enregistrements d'un export réel, servis par le serveur simulé.
+    """
+    return mock_server.load_records(RECORDS_FILE)[:RECORDS]
+
+
+@pytest.fixture
+def serve(records):
+    """
+    Démarre un serveur simulé sur un port libre ; renvoie son URL. Les options sont celles de
+    mock_server.create_server (latency, error_rate, max_concurrency, pages, ...).
+    """
+    servers = []
+
+    def start(**options):
+        server = mock_server.create_server(options.pop("records", records), 0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def rate_controllers(monkeypatch):
+    """
+    Contrôleurs de débit neufs pour chaque test (les limites réduites d'un test ne freinent pas le suivant).
+    """
+    monkeypatch.setattr(rate_control, "controllers", {})
+    return rate_control.controllers
@@ -0,0 +1,100 @@
+import os
+
+from checkpoint import CheckpointJournal
+
+
+def make_journal(tmp_path, pages=3):
+    journal = CheckpointJournal(str(tmp_path / "export.ndjson.journal"))
+    journal.start(1, 0, 10)
+    for page in range(1, pages + 1):
+        journal.record_page(page, page * 100, [f"{page}{row}" for row in range(10)])
+    return journal
+
+
+def test_reload(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.close()
+
+    reloaded = CheckpointJournal(journal.path)
+
+    assert (reloaded.start_page, reloaded.end_page, reloaded.last_page) == (1, 10, 3)
+    assert reloaded.offset == 300
+    assert reloaded.records == 30
+    assert reloaded.next_page == 4
+    assert not reloaded.done
+
+
+def test_failed_page_and_missing_details(tmp_path):
+    journal = make_journal(tmp_path, pages=0)
+    journal.record_page(1, 0, [], failed=True)
+    journal.record_page(2, 50, ["21", "22"], missing_details=["22"])
+    journal.close()
+
+    pages = CheckpointJournal(journal.path).pages
+
+    assert pages[0]["failed"] is True
+    assert pages[1]["missing_details"] == ["22"]
+    assert "failed" not in pages[1]
+
+
+def test_torn_last_line_is_ignored_and_truncated(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.close()
+    valid_size = os.path.getsize(journal.path)
+    with open(journal.path, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"page": 4, "offset": 4')
+
+    reloaded = CheckpointJournal(journal.path)
+
+    assert reloaded.last_page == 3
+    assert reloaded.offset == 300
+    assert os.path.getsize(journal.path) == valid_size
+    # New entries start on a clean line
+    reloaded.record_page(4, 400, ["41"])
+    reloaded.close()
+    assert CheckpointJournal(journal.path).last_page == 4
+
+
+def test_mark_done(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.mark_done()
+    journal.close()
+
+    assert CheckpointJournal(journal.path).done
+
+
+def test_start_discards_previous_content(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.start(5, 0)
+    journal.close()
+
+    reloaded = CheckpointJournal(journal.path)
+
+    assert reloaded.start_page == 5
+    assert reloaded.end_page is None
+    assert reloaded.pages == []
+    assert reloaded.next_page == 5
+
+
+def test_find_latest_skips_finished_exports(tmp_path):
+    finished = CheckpointJournal(CheckpointJournal.path_for(str(tmp_path / "export_1.ndjson")))
+    finished.start(1, 0)
+    finished.mark_done()
+    finished.close()
+    unfinished = CheckpointJournal(CheckpointJournal.path_for(str(tmp_path / "export_2.ndjson")))
+    unfinished.start(1, 0)
+    unfinished.close()
+    os.utime(finished.path, (0, 0))
+
+    assert CheckpointJournal.find_latest(str(tmp_path / "export_*.ndjson")) == str(tmp_path / "export_2.ndjson")
+    assert CheckpointJournal.find_latest(str(tmp_path / "autre_*.ndjson")) is None
+
+
+def test_crawl_options(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "export.ndjson.journal"))
+    journal.start(1, 0, 10, {"filtered": True, "details": False})
+    journal.close()
+
+    assert CheckpointJournal(journal.path).options == {"filtered": True, "details": False}
+    # Journals of older versions have no options
+    assert make_journal(tmp_path).options is None
@@ -0,0 +1,82 @@
+import datetime
+import json
+
+import pytest
+
+import columnar
+
+RECORDS = [
+    {"Identifiant": "1", "Commune": "ÉVIAN", "Site en activité": "Oui", "Exploitation en eau": "Non",
+     "Substances": "Argile", "Longitude": "6.59", "Latitude": "46.4", "Date de fin d'autorisation": "2031",
+     "Type": "Autorisation", "Date début validité": "2013-03-13T00:00:00", "Volume total (kt)": "1 200,5",
+     "Nom": "Carrière du Lac"},
+    {"Identifiant": "2", "Commune": "ÉVIAN", "Site en activité": "Non", "Substances": "Argile",
+     "Longitude": "", "Latitude": None, "Date de fin d'autorisation": "inconnue",
+     "Date début validité": "15/09/1972"},
+]
+
+
+@pytest.mark.parametrize("parse, value, expected", [
+    (columnar.parse_float, "310.25", 310.25),
+    (columnar.parse_float, "1 200,5", 1200.5),
+    (columnar.parse_float, "1 500 000", 1500000.0),
+    (columnar.parse_float, "", None),
+    (columnar.parse_float, None, None),
+    (columnar.parse_date, "2013-03-13T00:00:00", datetime.date(2013, 3, 13)),
+    (columnar.parse_date, "15/09/1972", datetime.date(1972, 9, 15)),
+    (columnar.parse_date, "date inconnue", None),
+    (columnar.parse_year, "2031", 2031),
+    (columnar.parse_year, "inconnue", None),
+    (columnar.parse_bool, "Oui", True),
+    (columnar.parse_bool, "Non", False),
+    (columnar.parse_bool, "", None),
+])
+def test_normalisers(parse, value, expected):
+    assert parse(value) == expected
+
+
+def test_normalise_batch():
+    columns = columnar.normalise_batch(RECORDS, ["Identifiant", "Longitude", "Date de fin d'autorisation", "Produits"])
+
+    assert columns == {
+        "Identifiant": ["1", "2"],
+        "Longitude": [6.59, None],
+        "Date de fin d'autorisation": [2031, None],
+        "Produits": [None, None],
+    }
+
+
+def test_parquet_schema(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    json_filename = str(tmp_path / "details_results_20241122_163223.ndjson")
+    with open(json_filename, "w", encoding="utf-8") as ndjson_file:
+        for record in RECORDS:
+            ndjson_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    parquet_filename = str(tmp_path / "details_results_20241122_163223.parquet")
+
+    assert columnar.convert_to_parquet(json_filename, parquet_filename, batch_size=1) == 2
+
+    table = pq.read_table(parquet_filename)
+    schema = table.schema
+    assert schema.field("Identifiant").type == pa.string()
+    assert schema.field("Longitude").type == pa.float64()
+    assert schema.field("Latitude").type == pa.float64()
+    assert schema.field("Volume total (kt)").type == pa.float64()
+    assert schema.field("Date de fin d'autorisation").type == pa.int16()
+    assert schema.field("Date début validité").type == pa.date32()
+    assert schema.field("Site en activité").type == pa.bool_()
+    for field in ["Commune", "Substances", "Type", "Nom"]:
+        assert pa.types.is_dictionary(schema.field(field).type)
+        assert schema.field(field).type.value_type == pa.string()
+    # Columns are collected from the records, sorted
+    assert schema.names == sorted(schema.names)
+
+    rows = table.to_pylist()
+    assert [row["Longitude"] for row in rows] == [6.59, None]
+    assert [row["Date de fin d'autorisation"] for row in rows] == [2031, None]
+    assert [row["Date début validité"] for row in rows] == [datetime.date(2013, 3, 13), datetime.date(1972, 9, 15)]
+    assert [row["Volume total (kt)"] for row in rows] == [1200.5, None]
+    assert [row["Commune"] for row in rows] == ["ÉVIAN", "ÉVIAN"]
+    assert pq.ParquetFile(parquet_filename).metadata.num_row_groups == 2
+
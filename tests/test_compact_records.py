@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import os
+
+import pytest
+
+import mock_server
+from compact_records import CompactRecord, iter_compact, parse_coordinate
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+@pytest.mark.parametrize("export", sorted(
+    os.path.join(ROOT, "output", file_name) for file_name in os.listdir(os.path.join(ROOT, "output"))
+    if file_name.endswith(".json")
+))
+def test_round_trip_on_exports(export):
+    for record in mock_server.load_records(export):
+        compact = CompactRecord(record)
+        # Same values and key order, so the JSON written from it is unchanged
+        assert json.dumps(compact.to_dict(), ensure_ascii=False) == json.dumps(record, ensure_ascii=False)
+        assert compact == record
+
+
+def test_extra_and_absent_fields():
+    record = {"Identifiant": "1", "Commune": "Évian", "Champ inconnu": [1, 2]}
+    compact = CompactRecord(record)
+
+    assert compact["Champ inconnu"] == [1, 2]
+    assert "Nom" not in compact
+    assert "Commune" in compact
+    assert compact.get("Nom", "?") == "?"
+    with pytest.raises(KeyError):
+        compact["Nom"]
+    assert dict(compact) == record
+    assert list(compact.keys()) == ["Identifiant", "Commune", "Champ inconnu"]
+
+
+def test_coordinates():
+    compact = CompactRecord({"Longitude": "2.190018", "Latitude": "45.10"})
+
+    assert compact.longitude == 2.190018
+    assert compact["Longitude"] == "2.190018"
+    # Kept as text when a float would not write it back identically
+    assert compact.latitude == "45.10"
+    assert parse_coordinate(None) is None
+    assert parse_coordinate("") == ""
+
+
+def test_interned_values():
+    first = CompactRecord({"Commune": "".join(["Év", "ian"])})
+    second = CompactRecord({"Commune": "".join(["Évi", "an"])})
+
+    assert first.commune is second.commune
+
+
+def test_csv_dict_writer():
+    records = [CompactRecord({"Identifiant": "1", "Longitude": "2.5"}), CompactRecord({"Identifiant": "2"})]
+    output = io.StringIO()
+
+    writer = csv.DictWriter(output, fieldnames=["Identifiant", "Longitude"])
+    writer.writeheader()
+    writer.writerows(records)
+
+    assert output.getvalue().splitlines() == ["Identifiant,Longitude", "1,2.5", "2,"]
+
+
+def test_iter_compact(tmp_path):
+    filename = str(tmp_path / "export.ndjson")
+    with open(filename, "w", encoding="utf-8") as ndjson_file:
+        ndjson_file.write('{"Identifiant": "1", "Nom": "Carrière"}\n{"Identifiant": "2"}\n')
+
+    assert [record.to_dict() for record in iter_compact(filename)] == [
+        {"Identifiant": "1", "Nom": "Carrière"}, {"Identifiant": "2"},
+    ]
@@ -0,0 +1,65 @@
+import pytest
+
+import coverage_audit
+from checkpoint import CheckpointJournal
+
+
+def write_export(tmp_path, pages, end_page=None, missing_details=None):
+    """
+    Écrit un export NDJSON et son journal ; `pages` associe à chaque page validée ses identifiants
+    (None pour une page en échec), `missing_details` les identifiants sans fiche par page.
+    """
+    filename = str(tmp_path / "export.ndjson")
+    journal = CheckpointJournal(CheckpointJournal.path_for(filename))
+    journal.start(min(pages), 0, end_page)
+    offset = 0
+    with open(filename, "w", encoding="utf-8") as output:
+        for page, identifiants in pages.items():
+            for identifiant in identifiants or []:
+                offset += output.write(f'{{"Identifiant": "{identifiant}"}}\n')
+            journal.record_page(page, offset, identifiants or [], failed=identifiants is None,
+                                missing_details=(missing_details or {}).get(page, ()))
+    return filename, journal
+
+
+def test_complete_export(tmp_path):
+    filename, journal = write_export(tmp_path, {1: ["11", "12"], 2: ["21", "22"], 3: ["31"]}, end_page=3)
+
+    gaps = coverage_audit.audit(journal, filename)
+
+    assert coverage_audit.is_complete(gaps)
+    assert gaps.expected_pages == 3
+    assert gaps.journal_records == gaps.output_records == 5
+    assert "Export complet." in coverage_audit.format_report(gaps)
+
+
+def test_gaps(tmp_path):
+    filename, journal = write_export(tmp_path, {1: ["11", "12"], 2: None, 3: ["31"], 5: ["51", "52"], 6: ["61"]},
+                                     end_page=7, missing_details={5: ["52"]})
+
+    gaps = coverage_audit.audit(journal, filename)
+
+    assert gaps.missing_pages == [4, 7]
+    assert gaps.failed_pages == [2]
+    assert gaps.short_pages == [3, 6]
+    assert gaps.missing_details == {5: ["52"]}
+    assert not coverage_audit.is_complete(gaps)
+    assert "--repair" in coverage_audit.format_report(gaps)
+
+
+def test_output_shorter_than_journal(tmp_path):
+    filename, journal = write_export(tmp_path, {1: ["11", "12"]}, end_page=1)
+    with open(filename, "rb+") as output:
+        output.truncate(10)
+
+    gaps = coverage_audit.audit(journal, filename)
+
+    assert gaps.output_records == 0
+    assert not coverage_audit.is_complete(gaps)
+
+
+def test_empty_journal(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "absent.ndjson.journal"))
+
+    with pytest.raises(ValueError):
+        coverage_audit.audit(journal, str(tmp_path / "absent.ndjson"))
@@ -0,0 +1,92 @@
+import csv
+import json
+
+import pytest
+
+from checkpoint import CheckpointJournal
+from delta import ABSENT, MISSING_DETAILS, MODIFIED, NEW, DeltaIndex, pack_enrichment, unpack_enrichment
+from parsers import ADDITIONAL_FIELDS, LISTING_FIELDS
+
+PREVIOUS = [
+    {"Identifiant": "1", "Commune": "Évian", "Substances": "Argile",
+     "Type": "Autorisation", "Date début validité": "2013-03-13T00:00:00", "Volume total (kt)": None,
+     "Nom": "Carrière du Lac", "Exploitée par": ""},
+    {"Identifiant": "2", "Commune": "Lyon", "Substances": "Calcaire"},
+    {"Identifiant": "3", "Commune": "Grenoble", "Substances": "Sables"},
+    {"Identifiant": "4", "Commune": "Annecy", "Substances": "Gypse", "Nom": "Carrière d'Annecy"},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    filename = str(tmp_path / "details_results_20241122_163223.ndjson")
+    with open(filename, "w", encoding="utf-8") as ndjson_file:
+        for record in PREVIOUS:
+            ndjson_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    # The fiche of record 2 could not be fetched in the previous run
+    journal = CheckpointJournal(CheckpointJournal.path_for(filename))
+    journal.start(1, 0, 1)
+    journal.record_page(1, 0, [record["Identifiant"] for record in PREVIOUS], missing_details=["2"])
+    journal.mark_done()
+    journal.close()
+    return DeltaIndex(filename, LISTING_FIELDS + ADDITIONAL_FIELDS)
+
+
+def listing(record):
+    return {field: record.get(field) for field in LISTING_FIELDS + ADDITIONAL_FIELDS if field in record}
+
+
+def test_classify(index):
+    assert index.classify(listing(PREVIOUS[0])) is None
+    assert index.classify(listing(PREVIOUS[1])) == MISSING_DETAILS
+    assert index.classify(dict(listing(PREVIOUS[2]), Substances="Sables, Graviers")) == MODIFIED
+    assert index.classify({"Identifiant": "5", "Commune": "Nice"}) == NEW
+
+    # Only new and modified rows are changes; the refetched fiche is not
+    assert index.changes == [("3", MODIFIED), ("5", NEW)]
+    assert index.removed() == ["4"]
+
+
+def test_enrichment_round_trip(index):
+    assert index.enrichment("1") == {
+        "Type": "Autorisation", "Date début validité": "2013-03-13T00:00:00", "Volume total (kt)": None,
+        "Nom": "Carrière du Lac", "Exploitée par": "",
+    }
+    assert index.enrichment("2") == {}
+    assert index.enrichment("4") == {"Nom": "Carrière d'Annecy"}
+
+
+def test_save_changes(index, tmp_path):
+    index.classify(dict(listing(PREVIOUS[2]), Commune="Échirolles"))
+    index.classify({"Identifiant": "10", "Commune": "Nice"})
+    index.classify(listing(PREVIOUS[0]))
+    index.classify(listing(PREVIOUS[1]))
+    changes_filename = str(tmp_path / "changes.csv")
+
+    count = index.save_changes(changes_filename)
+
+    with open(changes_filename, encoding="utf-8", newline="") as csv_file:
+        rows = list(csv.reader(csv_file))
+    assert count == 3
+    assert rows == [["Identifiant", "Changement"], ["10", "nouveau"], ["3", "modifié"], ["4", "supprimé"]]
+
+
+def test_without_journal(tmp_path):
+    filename = str(tmp_path / "details_results_20241122_163223.json")
+    with open(filename, "w", encoding="utf-8") as json_file:
+        json.dump(PREVIOUS, json_file, ensure_ascii=False)
+
+    index = DeltaIndex(filename, LISTING_FIELDS + ADDITIONAL_FIELDS)
+
+    assert index.missing_details == set()
+    assert index.classify(listing(PREVIOUS[1])) is None
+
+
+def test_pack_enrichment():
+    assert pack_enrichment({"Identifiant": "2", "Commune": "Lyon"}) is None
+    assert unpack_enrichment(None) == {}
+
+    packed = pack_enrichment(PREVIOUS[3])
+    assert packed[-2] == "Carrière d'Annecy"
+    assert packed.count(ABSENT) == len(packed) - 1
+    assert unpack_enrichment(packed) == {"Nom": "Carrière d'Annecy"}
@@ -0,0 +1,358 @@
+import glob
+import json
+import os
+
+import pytest
+
+import coverage_audit
+import export_details_data
+import http_client
+import mock_server
+import records_io
+from checkpoint import CheckpointJournal
+from delta import DeltaIndex
+from html_archive import ArchiveWriter
+from session_pool import SessionPool
+from parsers import ADDITIONAL_FIELDS, DETAILS_FIELDS, LISTING_FIELDS
+from work_queue import WorkQueue
+
+CLOSED_URL = "http://127.0.0.1:9"  # Aucun serveur : chaque requête échoue
+
+
+def use_server(monkeypatch, url):
+    """
+    Pointe les URL InfoTerre et mineralinfo du moteur vers le serveur simulé.
+    """
+    monkeypatch.setattr(export_details_data, "INFOTERRE_URL", url)
+    monkeypatch.setattr(export_details_data, "MINERALINFO_URL", url)
+    monkeypatch.setattr(export_details_data, "BASE_URL", f"{url}/rechercher/pagine.htm")
+
+
+@pytest.fixture
+def engine(serve, tmp_path, monkeypatch):
+    """
+    Moteur d'export pointé vers un serveur simulé neuf, écrivant dans tmp_path.
+    """
+    use_server(monkeypatch, serve())
+    monkeypatch.setattr(export_details_data, "json_filename", str(tmp_path / "details_results_20250101_000000.ndjson"))
+    monkeypatch.setattr(export_details_data, "csv_filename", str(tmp_path / "details_results_20250101_000000.csv"))
+    monkeypatch.setattr(export_details_data, "filtered", False)
+    monkeypatch.setattr(export_details_data, "PARSE_PROCESSES", 1)
+    monkeypatch.setattr(export_details_data, "with_details", True)
+    monkeypatch.setattr(export_details_data, "details_cache", None)
+    monkeypatch.setattr(export_details_data, "delta_index", None)
+    monkeypatch.setattr(export_details_data, "search_sessions", None)
+    monkeypatch.setattr(export_details_data, "html_archive", None)
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(http_client, "MAX_RETRIES", 1)
+    return export_details_data
+
+
+def crawl(engine):
+    filename = engine.fetch_all_results(start_page=1)
+    return filename, CheckpointJournal(CheckpointJournal.path_for(filename))
+
+
+def read_bytes(filename):
+    with open(filename, "rb") as data_file:
+        return data_file.read()
+
+
+def test_crawl(engine, records):
+    filename, journal = crawl(engine)
+
+    exported = list(records_io.iter_records(filename))
+    assert [record["Identifiant"] for record in exported] == [record["Identifiant"] for record in records]
+    assert all(set(record) <= set(LISTING_FIELDS + ADDITIONAL_FIELDS + DETAILS_FIELDS) for record in exported)
+    assert any("Nom" in record for record in exported)
+    assert journal.done
+    assert coverage_audit.is_complete(coverage_audit.audit(journal, filename))
+
+
+def test_resume_after_interruption(engine):
+    filename, journal = crawl(engine)
+    complete = read_bytes(filename)
+    first_page = journal.pages[0]
+    journal.close()
+
+    # Stopped while page 2 was being written: only page 1 was committed
+    interrupted = CheckpointJournal(journal.path)
+    interrupted.start(1, 0, 3)
+    interrupted.record_page(1, first_page["offset"], first_page["records"])
+    interrupted.close()
+    with open(filename, "wb") as output:
+        output.write(complete[:first_page["offset"]] + b'{"Identifiant": "tronqu')
+
+    engine.fetch_all_results(resume=True, start_page=1)
+
+    assert read_bytes(filename) == complete
+    resumed = CheckpointJournal(journal.path)
+    assert resumed.done
+    assert [entry["page"] for entry in resumed.pages] == [1, 2, 3]
+
+
+def test_resume_without_journal_keeps_file(engine):
+    with open(engine.json_filename, "w", encoding="utf-8") as output:
+        output.write('{"Identifiant": "1"}\n')
+
+    with pytest.raises(Exception, match="Aucun journal"):
+        engine.fetch_all_results(resume=True, start_page=1)
+
+    assert read_bytes(engine.json_filename) == b'{"Identifiant": "1"}\n'
+
+
+def test_network_errors_recorded_then_repaired(engine, monkeypatch):
+    expected_filename, expected_journal = crawl(engine)
+    expected = read_bytes(expected_filename)
+    expected_journal.close()
+
+    # The fiche host is down: the crawl completes, every fiche is recorded as missing
+    online_url = engine.MINERALINFO_URL
+    monkeypatch.setattr(engine, "json_filename", expected_filename.replace("000000", "000001"))
+    monkeypatch.setattr(engine, "MINERALINFO_URL", CLOSED_URL)
+    filename, journal = crawl(engine)
+    gaps = coverage_audit.audit(journal, filename)
+    journal.close()
+    assert sum(len(identifiants) for identifiants in gaps.missing_details.values()) == 30
+    assert not coverage_audit.is_complete(gaps)
+
+    monkeypatch.setattr(engine, "MINERALINFO_URL", online_url)
+    engine.repair_export(filename)
+
+    assert read_bytes(filename) == expected
+    assert coverage_audit.is_complete(coverage_audit.audit(CheckpointJournal(journal.path), filename))
+
+
+def test_repair_failed_and_missing_pages(engine):
+    filename, journal = crawl(engine)
+    complete = read_bytes(filename)
+    pages = journal.pages
+    journal.close()
+
+    # Page 2 failed and page 3 was never committed
+    damaged = CheckpointJournal(journal.path)
+    damaged.start(1, 0, 3)
+    damaged.record_page(1, pages[0]["offset"], pages[0]["records"])
+    damaged.record_page(2, pages[0]["offset"], [], failed=True)
+    damaged.close()
+    with open(filename, "wb") as output:
+        output.write(complete[:pages[0]["offset"]])
+    gaps = coverage_audit.audit(CheckpointJournal(journal.path), filename)
+    assert (gaps.failed_pages, gaps.missing_pages) == ([2], [3])
+
+    assert engine.repair_export(filename) == 2
+
+    assert read_bytes(filename) == complete
+    assert CheckpointJournal(journal.path).done
+
+
+def test_delta_refetches_missing_fiches(engine, monkeypatch):
+    online_url = engine.MINERALINFO_URL
+    monkeypatch.setattr(engine, "MINERALINFO_URL", CLOSED_URL)
+    previous_filename, previous_journal = crawl(engine)
+    previous_journal.close()
+    assert not any("Nom" in record for record in records_io.iter_records(previous_filename))
+
+    monkeypatch.setattr(engine, "MINERALINFO_URL", online_url)
+    monkeypatch.setattr(engine, "json_filename", previous_filename.replace("000000", "000001"))
+    monkeypatch.setattr(engine, "delta_index", DeltaIndex(previous_filename, LISTING_FIELDS + ADDITIONAL_FIELDS))
+    filename, journal = crawl(engine)
+
+    assert any("Nom" in record for record in records_io.iter_records(filename))
+    assert not any(entry.get("missing_details") for entry in journal.pages)
+    # Unchanged rows whose fiche was refetched are not reported as changes
+    assert engine.delta_index.changes == []
+
+
+def interrupt_after_first_page(journal, filename):
+    """
+    Ramène l'export et son journal à leur état après la première page, comme après un arrêt brutal.
+    """
+    first_page = journal.pages[0]
+    with open(filename, "rb+") as output:
+        output.truncate(first_page["offset"])
+    interrupted = CheckpointJournal(journal.path)
+    interrupted.start(1, 0, journal.end_page, journal.options)
+    interrupted.record_page(1, first_page["offset"], first_page["records"])
+    interrupted.close()
+
+
+def test_journal_records_crawl_options(engine, monkeypatch):
+    monkeypatch.setattr(engine, "filtered", True)
+    monkeypatch.setattr(engine, "with_details", False)
+
+    _, journal = crawl(engine)
+
+    assert journal.options == {"filtered": True, "details": False}
+
+
+def test_resume_restores_crawl_options(engine, monkeypatch):
+    # Started by export_data.py (--filtered --no-details), resumed by export_details_data.py --resume
+    monkeypatch.setattr(engine, "filtered", True)
+    monkeypatch.setattr(engine, "with_details", False)
+    filename, journal = crawl(engine)
+    complete = read_bytes(filename)
+    interrupt_after_first_page(journal, filename)
+    monkeypatch.setattr(engine, "filtered", False)
+    monkeypatch.setattr(engine, "with_details", True)
+    monkeypatch.setattr(engine, "CACHE_FILE", None)
+
+    engine.main(["--resume", filename])
+
+    assert read_bytes(filename) == complete
+    assert (engine.filtered, engine.with_details) == (True, False)
+
+
+def test_resume_with_other_options_refused(engine, monkeypatch):
+    filename, journal = crawl(engine)
+    interrupt_after_first_page(journal, filename)
+    interrupted = read_bytes(filename)
+    monkeypatch.setattr(engine, "with_details", False)
+
+    with pytest.raises(Exception, match="autres options"):
+        engine.fetch_all_results(resume=True, start_page=1)
+
+    assert read_bytes(filename) == interrupted
+
+
+def test_repair_with_other_options_refused(engine, monkeypatch):
+    filename, journal = crawl(engine)
+    journal.close()
+    monkeypatch.setattr(engine, "filtered", True)
+
+    with pytest.raises(Exception, match="autres options"):
+        engine.repair_export(filename)
+
+
+def test_delta_with_other_options_refused(engine, monkeypatch):
+    previous_filename, journal = crawl(engine)
+    journal.close()
+    monkeypatch.setattr(engine, "json_filename", previous_filename.replace("000000", "000001"))
+    monkeypatch.setattr(engine, "filtered", True)
+    monkeypatch.setattr(engine, "CACHE_FILE", None)
+    monkeypatch.setattr(engine, "find_previous_export", lambda: previous_filename)
+
+    engine.main(["--delta", "--filtered"])
+
+    assert not os.path.exists(engine.json_filename)
+
+
+def test_coordinator_refuses_shards_with_other_options(engine, tmp_path, monkeypatch):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    queue.create(1, 3, shard_pages=2)
+    for shard, options in zip(queue.shards(), [{"filtered": False, "details": True},
+                                                {"filtered": False, "details": False}]):
+        open(queue.output_for(shard), "w").close()
+        shard_journal = CheckpointJournal(CheckpointJournal.path_for(queue.output_for(shard)))
+        shard_journal.start(shard.first_page, 0, shard.last_page, options)
+        shard_journal.mark_done()
+        shard_journal.close()
+        queue.complete(queue.claim("worker"), "worker")
+    queue.close()
+
+    with pytest.raises(Exception, match="autres options"):
+        engine.run_coordinator(queue.path, workers=0, start_page=1)
+
+    assert not os.path.exists(engine.json_filename)
+
+
+def test_replay_restores_archived_options(engine, records, tmp_path):
+    archive = ArchiveWriter(str(tmp_path / "archive"), options={"filtered": True, "details": False})
+    archive.append("page", 1, engine.BASE_URL, mock_server.render_listing_page(records, 1, 1))
+    archive.close()
+
+    filename = engine.replay_archive(archive.directory)
+
+    assert (engine.filtered, engine.with_details) == (True, False)
+    journal = CheckpointJournal(CheckpointJournal.path_for(filename))
+    assert journal.options == {"filtered": True, "details": False}
+    # Fiches were not archived by a crawl without fiches: they are not missing
+    assert not any(entry.get("missing_details") for entry in journal.pages)
+
+
+def test_replay_matches_crawl(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "CACHE_FILE", None)
+    archive_dir = str(tmp_path / "archive")
+    crawled_filename = engine.json_filename
+    engine.main(["--archive", archive_dir, "--start-page", "1"])
+
+    monkeypatch.setattr(engine, "json_filename", crawled_filename.replace("000000", "000001"))
+    engine.main(["--replay", archive_dir])
+
+    assert read_bytes(engine.json_filename) == read_bytes(crawled_filename)
+    journal = CheckpointJournal(CheckpointJournal.path_for(engine.json_filename))
+    assert journal.done
+    assert coverage_audit.is_complete(coverage_audit.audit(journal, engine.json_filename))
+
+
+def test_replay_after_truncated_index_line(engine, tmp_path, monkeypatch):
+    archive_dir = str(tmp_path / "archive")
+    monkeypatch.setattr(engine, "html_archive", ArchiveWriter(archive_dir, options=engine.crawl_options()))
+    crawled_filename, journal = crawl(engine)
+    journal.close()
+    engine.html_archive.close()
+    # The crawl was killed while indexing the last archived response, a fiche
+    (index_path,) = glob.glob(os.path.join(archive_dir, "*.idx"))
+    with open(index_path, "rb") as index_file:
+        lines = index_file.readlines()
+    last_fiche = json.loads(lines[-1])
+    assert last_fiche["kind"] == "fiche"
+    with open(index_path, "wb") as index_file:
+        index_file.writelines(lines[:-1] + [lines[-1][:30]])
+
+    monkeypatch.setattr(engine, "json_filename", crawled_filename.replace("000000", "000001"))
+    engine.replay_archive(archive_dir)
+
+    gaps = coverage_audit.audit(CheckpointJournal(CheckpointJournal.path_for(engine.json_filename)), engine.json_filename)
+    (page,) = [entry["page"] for entry in journal.pages if last_fiche["key"] in entry["records"]]
+    assert gaps.missing_details == {page: [last_fiche["key"]]}
+    assert not gaps.missing_pages
+
+
+def test_expired_sessions_rebuilt(engine, serve, monkeypatch):
+    # MOCK_SESSION_TTL: each search session expires after 0.5 s, a crawl of 30 pages takes longer
+    use_server(monkeypatch, serve(session_ttl=0.5, pages=30))
+    monkeypatch.setattr(engine, "with_details", False)
+    monkeypatch.setattr(engine, "search_sessions", SessionPool(engine.create_search_session, 2))
+
+    filename, journal = crawl(engine)
+
+    assert engine.search_sessions.rebuilds > 0
+    assert [entry["page"] for entry in journal.pages] == list(range(1, 31))
+    assert coverage_audit.is_complete(coverage_audit.audit(journal, filename))
+
+
+def test_failed_session_rebuild_recorded_then_repaired(engine, serve, monkeypatch):
+    use_server(monkeypatch, serve(session_ttl=0.5, pages=20))
+    monkeypatch.setattr(engine, "with_details", False)
+    create_search_session = engine.create_search_session
+    online = [True]
+
+    def flaky_create_search_session():
+        if not online[0]:
+            raise Exception("Erreur lors du lancement de la recherche: 503")
+        return create_search_session()
+
+    monkeypatch.setattr(engine, "search_sessions", SessionPool(flaky_create_search_session, 1))
+    # Once the session expires, the search can no longer be launched
+    online[0] = False
+
+    filename, journal = crawl(engine)
+
+    gaps = coverage_audit.audit(journal, filename)
+    journal.close()
+    assert engine.search_sessions.rebuilds == 0
+    assert gaps.failed_pages
+    assert journal.done
+
+    online[0] = True
+    engine.repair_export(filename)
+
+    assert coverage_audit.is_complete(coverage_audit.audit(CheckpointJournal(journal.path), filename))
+
+
+def test_first_page_unreachable(engine, monkeypatch):
+    monkeypatch.setattr(engine, "BASE_URL", f"{CLOSED_URL}/rechercher/pagine.htm")
+
+    with pytest.raises(Exception, match="Première page"):
+        engine.fetch_all_results(start_page=1)
@@ -0,0 +1,70 @@
+import glob
+import os
+
+from html_archive import ArchiveReader, ArchiveWriter
+
+
+def test_read_back(tmp_path):
+    archive = ArchiveWriter(str(tmp_path), options={"filtered": False, "details": True})
+    archive.append("page", 1, "http://infoterre/pagine.htm", "<html>page 1</html>")
+    archive.append("fiche", "115602", "http://mineralinfo/Fiches/carmat/115602", "<html>fiche é</html>")
+    archive.append("page", 1, "http://infoterre/pagine.htm", "<html>page 1 bis</html>")
+    archive.close()
+
+    reader = ArchiveReader(str(tmp_path))
+
+    # The latest version of a response wins
+    assert reader.read("page", 1) == "<html>page 1 bis</html>"
+    assert reader.read("fiche", 115602) == "<html>fiche é</html>"
+    assert reader.read("fiche", "1") is None
+    assert reader.keys("page") == ["1"]
+    assert reader.options == [{"filtered": False, "details": True}]
+    reader.close()
+
+
+def test_truncated_final_index_line(tmp_path):
+    archive = ArchiveWriter(str(tmp_path))
+    archive.append("page", 1, "url", "<html>page 1</html>")
+    archive.append("page", 2, "url", "<html>page 2</html>")
+    archive.close()
+    # Killed while writing the index line of page 2
+    (index_path,) = glob.glob(os.path.join(str(tmp_path), "*.idx"))
+    with open(index_path, "rb+") as index_file:
+        index_file.truncate(os.path.getsize(index_path) - 20)
+
+    reader = ArchiveReader(str(tmp_path))
+
+    assert reader.keys("page") == ["1"]
+    assert reader.read("page", 1) == "<html>page 1</html>"
+    assert reader.read("page", 2) is None
+    reader.close()
+
+
+def test_truncated_response_is_not_referenced(tmp_path):
+    archive = ArchiveWriter(str(tmp_path))
+    archive.append("page", 1, "url", "<html>page 1</html>")
+    archive.close()
+    # Killed while writing a response: its index line was never written
+    (segment_path,) = glob.glob(os.path.join(str(tmp_path), "*.html.gz"))
+    with open(segment_path, "ab") as segment:
+        segment.write(b"\x1f\x8b\x08partiel")
+
+    reader = ArchiveReader(str(tmp_path))
+
+    assert reader.keys("page") == ["1"]
+    assert reader.read("page", 1) == "<html>page 1</html>"
+    reader.close()
+
+
+def test_segments_roll_over(tmp_path):
+    archive = ArchiveWriter(str(tmp_path), segment_size=1, options={"filtered": True, "details": True})
+    for page in range(1, 4):
+        archive.append("page", page, "url", f"<html>page {page}</html>")
+    archive.close()
+
+    reader = ArchiveReader(str(tmp_path))
+
+    assert archive.segments == 4
+    assert [reader.read("page", page) for page in range(1, 4)] == [f"<html>page {page}</html>" for page in range(1, 4)]
+    assert reader.options == [{"filtered": True, "details": True}]
+    reader.close()
@@ -0,0 +1,159 @@
+import glob
+import os
+import subprocess
+import sys
+
+import pytest
+
+import html_parsing
+import mock_server
+import parsers
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Pages enregistrées : celles des tests, et les pages réelles de benchmarks/record_fixtures.py si présentes
+FIXTURE_DIRS = [
+    os.path.join(TESTS_DIR, "fixtures", "html"),
+    os.path.join(TESTS_DIR, "..", "benchmarks", "fixtures"),
+]
+RENDERED_PAGES = 3  # Pages générées par le serveur simulé à partir d'un export réel
+REFERENCE_BACKEND = "html.parser"
+RECORDS_FILE = os.path.join(TESTS_DIR, "..", "output", "details_results_20241122_191300.json")  # Export réel avec fiches
+
+
+def saved_pages(prefix):
+    return sorted(path for directory in FIXTURE_DIRS for path in glob.glob(os.path.join(directory, f"{prefix}*.html")))
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as html_file:
+        return html_file.read()
+
+
+def rendered_listing_pages():
+    records = mock_server.load_records(RECORDS_FILE)
+    max_pages = -(-len(records) // mock_server.PAGE_SIZE)
+    return [mock_server.render_listing_page(records, page, max_pages) for page in range(1, RENDERED_PAGES + 1)]
+
+
+def rendered_details_pages():
+    records = mock_server.load_records(RECORDS_FILE)
+    # Fiches with an AP table or an operator, which most records lack
+    enriched = [record for record in records if record.get("Date début validité") or record.get("Exploitée par")]
+    return [mock_server.render_details_page(record) for record in records[:mock_server.PAGE_SIZE] + enriched]
+
+
+LISTING_PAGES = [pytest.param(read(path), id=os.path.basename(path)) for path in saved_pages("pagine_")] + [
+    pytest.param(html, id=f"rendu_{index}") for index, html in enumerate(rendered_listing_pages(), start=1)
+]
+DETAILS_PAGES = [pytest.param(read(path), id=os.path.basename(path)) for path in saved_pages("carmat_")] + [
+    pytest.param(html, id=f"rendu_{index}") for index, html in enumerate(rendered_details_pages(), start=1)
+]
+BACKENDS = [
+    pytest.param(backend, marks=pytest.mark.skipif(not html_parsing.is_available(backend), reason=f"{backend} absent"))
+    for backend in html_parsing.BACKENDS
+]
+
+
+MODES = ["complet", "ciblé"]  # "complet" analyse toute la page (parse_only ignoré), "ciblé" garde les SoupStrainer
+
+
+def parse_with(backend, mode, function, html_content):
+    previous = html_parsing.get_backend()
+    html_parsing.set_backend(backend)
+    try:
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            if mode == "complet":
+                make_soup = html_parsing.make_soup
+                monkeypatch.setattr(html_parsing, "make_soup",
+                                    lambda html_content, parse_only=None: make_soup(html_content))
+            return function(html_content)
+    finally:
+        html_parsing.set_backend(previous)
+
+
+def parse_listing(html_content):
+    return parsers.get_max_pages(html_content), parsers.parse_listing_page(html_content)
+
+
+def parse_details(html_content):
+    return (
+        parsers.extract_most_recent_ap(html_content),
+        parsers.extract_additional_parameters(html_content),
+        parsers.parse_details_page(html_content),
+    )
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("html_content", LISTING_PAGES)
+def test_listing_page_matches_reference(html_content, backend, mode):
+    reference = parse_with(REFERENCE_BACKEND, "complet", parse_listing, html_content)
+    assert parse_with(backend, mode, parse_listing, html_content) == reference
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("html_content", DETAILS_PAGES)
+def test_details_page_matches_reference(html_content, backend, mode):
+    reference = parse_with(REFERENCE_BACKEND, "complet", parse_details, html_content)
+    assert parse_with(backend, mode, parse_details, html_content) == reference
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_listing_quirks(backend, mode):
+    html_content = read(os.path.join(FIXTURE_DIRS[0], "pagine_quirks.html"))
+    max_pages, (results, carmat_ids) = parse_with(backend, mode, parse_listing, html_content)
+
+    assert max_pages == 2318
+    assert carmat_ids == ["115602", "98001"]
+    assert results[0]["Commune"] == "SAINT-MARTIN-D'HÈRES"
+    assert results[0]["Numéro S3IC"] == "0070.01234"
+    assert results[0]["Substances"] == "Sables & graviers, Calcaire"
+    assert results[1]["Numéro S3IC"] == ""
+    assert results[1]["Produits"] is None
+    assert results[1]["Latitude"] == "46.4"
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_details_quirks(backend, mode):
+    html_content = read(os.path.join(FIXTURE_DIRS[0], "carmat_quirks.html"))
+    details = parse_with(backend, mode, parsers.parse_details_page, html_content)
+
+    assert details["Type"] == "Renouvellement"
+    assert details["Date début validité"].isoformat() == "2013-03-13T00:00:00"
+    assert details["Volume total (kt)"] == "2 400,5"
+    assert details["Nom"] == "Carrière des Îles & Sablières"
+    assert details["Exploitée par"] == "SOCIÉTÉ DES CARRIÈRES DU GRÉSIVAUDAN"
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_details_without_history(backend, mode):
+    html_content = read(os.path.join(FIXTURE_DIRS[0], "carmat_no_history.html"))
+    assert parse_with(backend, mode, parsers.parse_details_page, html_content) == {"Nom": "ÉVIAN NORD"}
+
+
+def test_invalid_parser_falls_back(monkeypatch, capsys):
+    monkeypatch.setattr(html_parsing, "HTML_PARSER", "html5lib")
+    monkeypatch.setattr(html_parsing, "backend", None)
+
+    soup = html_parsing.make_soup("<p>Carrière</p>")
+
+    assert soup.p.get_text() == "Carrière"
+    assert html_parsing.get_backend() == "html.parser"
+    assert "HTML_PARSER" in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        html_parsing.set_backend("html5lib")
+
+
+def test_invalid_parser_does_not_break_imports():
+    # merge_data, --convert and --audit import the parsers through compact_records and columnar
+    environment = dict(os.environ, HTML_PARSER="html5lib")
+    code = "import merge_data, columnar, coverage_audit, export_details_data, html_parsing; print(html_parsing.backend)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(TESTS_DIR, ".."), env=environment,
+                            capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "None"
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+import records_io
+from merge_data import is_export_file, merge_json_files
+
+
+def write_json(path, records):
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(records, json_file, ensure_ascii=False)
+
+
+def write_ndjson(path, records):
+    with open(path, "w", encoding="utf-8") as ndjson_file:
+        for record in records:
+            ndjson_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def exports(tmp_path):
+    # The newest run is an NDJSON export, the oldest a JSON array from older versions
+    write_json(tmp_path / "details_results_20241122_163223.json", [
+        {"Identifiant": "1", "Commune": "Évian", "Type": "Autorisation"},
+        {"Identifiant": "2", "Commune": "Lyon"},
+        {"Commune": "sans identifiant"},
+    ])
+    write_ndjson(tmp_path / "details_results_20241123_090000.ndjson", [
+        {"Identifiant": "2", "Commune": "Lyon"},
+        {"Identifiant": "1", "Commune": "Évian", "Type": "Renouvellement"},
+        {"Identifiant": "3", "Commune": "Grenoble"},
+    ])
+    return tmp_path
+
+
+@pytest.mark.parametrize("file_name, expected", [
+    ("details_results_20241122_163223.json", True),
+    ("details_results_20241122_163223.ndjson", True),
+    ("output/details_results_20241122_163223.ndjson", True),
+    ("details_results_20241122_163223.stats", False),
+    ("details_results_20241122_163223.stats.json", False),
+    ("details_results_20241122_163223.basic.ndjson", False),
+    ("details_results_20241122_163223.ndjson.journal", False),
+    ("results_20241122_163223.ndjson", False),
+    ("merged_results.json", False),
+])
+def test_is_export_file(file_name, expected):
+    assert is_export_file(file_name) is expected
+
+
+def test_keep_newest(exports, tmp_path):
+    output_file = str(tmp_path / "merged.ndjson")
+
+    stats = merge_json_files(str(exports), output_file)
+
+    assert list(records_io.iter_records(output_file)) == [
+        {"Identifiant": "1", "Commune": "Évian", "Type": "Renouvellement"},
+        {"Identifiant": "2", "Commune": "Lyon"},
+        {"Commune": "sans identifiant"},
+        {"Identifiant": "3", "Commune": "Grenoble"},
+    ]
+    assert stats == {"read": 6, "duplicates": 2, "conflicts": 1, "written": 4}
+
+
+def test_keep_oldest(exports, tmp_path):
+    output_file = str(tmp_path / "merged.ndjson")
+
+    merge_json_files(str(exports), output_file, keep="oldest")
+
+    assert next(records_io.iter_records(output_file))["Type"] == "Autorisation"
+
+
+def test_derived_and_listing_files_ignored(exports, tmp_path):
+    write_ndjson(exports / "results_20241124_100000.ndjson", [{"Identifiant": "1", "Commune": "Évian"}])
+    write_ndjson(exports / "details_results_20241124_100000.basic.ndjson", [{"Identifiant": "4"}])
+    with open(exports / "details_results_20241124_100000.stats", "w") as stats_file:
+        json.dump({"pages_done": 3}, stats_file)
+    output_file = str(tmp_path / "merged.ndjson")
+
+    stats = merge_json_files(str(exports), output_file)
+
+    assert stats["written"] == 4
+    assert next(records_io.iter_records(output_file))["Type"] == "Renouvellement"
+
+
+def test_invalid_json(tmp_path):
+    with open(tmp_path / "details_results_20241122_163223.json", "w") as json_file:
+        json_file.write('[{"Identifiant": "1"},')
+
+    with pytest.raises(ValueError):
+        merge_json_files(str(tmp_path), str(tmp_path / "merged.ndjson"))
+
+
+def test_unknown_keep_rule(tmp_path):
+    with pytest.raises(ValueError):
+        merge_json_files(str(tmp_path), str(tmp_path / "merged.ndjson"), keep="random")
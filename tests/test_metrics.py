@@ -0,0 +1,131 @@
+import re
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+import rate_control
+from pipeline import LATENCY_BUCKETS, StageStats
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+DURATIONS = [0.001, 0.003, 0.02, 0.2, 0.2, 0.7, 4.0, 45.0]
+
+
+def parse_exposition(text):
+    """
+    Lit le texte d'exposition Prometheus : types déclarés et échantillons (nom, étiquettes, valeur).
+    """
+    types, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name not in types
+            types[name] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            samples.append((name, dict(LABEL.findall(labels or "")), float(value)))
+    return types, samples
+
+
+def declared_type(types, name):
+    for suffix in ["_bucket", "_sum", "_count"]:
+        base = name[:-len(suffix)] if name.endswith(suffix) else None
+        if base and types.get(base) == "histogram":
+            return "histogram"
+    return types.get(name)
+
+
+@pytest.fixture
+def state():
+    stats = StageStats(["pages", "details", "write"])
+    for duration in DURATIONS:
+        stats.histograms["details"].observe(duration)
+    with stats.measure("pages", items=10):
+        pass
+    with pytest.raises(ValueError), stats.measure("write"):
+        raise ValueError
+    rate_control.controller_for("127.0.0.1:1")
+    progress = {"pages_total": 20, "pages_done": 5, "records": 50, "started_at": time.monotonic() - 10}
+    return metrics.snapshot(stats, progress)
+
+
+def test_prometheus_types(state):
+    types, samples = parse_exposition(metrics.format_prometheus(state))
+
+    prefix = metrics.PREFIX
+    assert types[f"{prefix}_pages_done"] == "gauge"
+    assert types[f"{prefix}_eta_seconds"] == "gauge"
+    assert types[f"{prefix}_stage_items_total"] == "counter"
+    assert types[f"{prefix}_stage_errors_total"] == "counter"
+    assert types[f"{prefix}_stage_duration_seconds"] == "histogram"
+    assert types[f"{prefix}_http_requests_total"] == "counter"
+    assert types[f"{prefix}_host_concurrency_limit"] == "gauge"
+    # Every sample belongs to a declared metric, counters end in _total
+    for name, _, _ in samples:
+        assert declared_type(types, name), name
+    assert all(name.endswith("_total") for name, kind in types.items() if kind == "counter")
+
+    values = {(name, tuple(sorted(labels.items()))): value for name, labels, value in samples}
+    assert values[(f"{prefix}_pages_done", ())] == 5
+    assert values[(f"{prefix}_stage_items_total", (("stage", "pages"),))] == 10
+    assert values[(f"{prefix}_stage_errors_total", (("stage", "write"),))] == 1
+    assert values[(f"{prefix}_host_concurrency_limit", (("host", "127.0.0.1:1"),))] == rate_control.INITIAL_CONCURRENCY
+
+
+def test_histogram_buckets_cumulative(state):
+    _, samples = parse_exposition(metrics.format_prometheus(state))
+
+    name = f"{metrics.PREFIX}_stage_duration_seconds"
+    for stage in ["pages", "details", "write"]:
+        buckets = [(labels["le"], value) for sample, labels, value in samples
+                   if sample == f"{name}_bucket" and labels["stage"] == stage]
+        count = next(value for sample, labels, value in samples
+                     if sample == f"{name}_count" and labels["stage"] == stage)
+        assert [bound for bound, _ in buckets] == [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        counts = [value for _, value in buckets]
+        assert counts == sorted(counts)
+        assert counts[-1] == count
+
+    details = {labels["le"]: value for sample, labels, value in samples
+               if sample == f"{name}_bucket" and labels["stage"] == "details"}
+    assert details["0.005"] == 2
+    assert details["0.25"] == 5
+    assert details["30.0"] == len(DURATIONS) - 1
+    assert details["+Inf"] == len(DURATIONS)
+    total = next(value for sample, labels, value in samples
+                 if sample == f"{name}_sum" and labels["stage"] == "details")
+    assert total == pytest.approx(sum(DURATIONS))
+
+
+def test_label_escaping():
+    stats = StageStats(['fiche "détail"\\'])
+    state = metrics.snapshot(stats, {})
+
+    _, samples = parse_exposition(metrics.format_prometheus(state))
+
+    stages = {labels["stage"] for name, labels, _ in samples if "stage" in labels}
+    assert stages == {'fiche \\"détail\\"\\\\'}
+
+
+def test_metrics_endpoint(state):
+    server = metrics.serve(0, lambda: state)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            text = response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/autre")
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert text == metrics.format_prometheus(state)
+    types, _ = parse_exposition(text)
+    assert types[f"{metrics.PREFIX}_stage_duration_seconds"] == "histogram"
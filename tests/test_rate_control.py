@@ -0,0 +1,137 @@
+import threading
+import time
+from email.utils import formatdate
+from urllib.parse import urlparse
+
+import pytest
+
+import http_client
+import rate_control
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+
+
+def controller_of(url):
+    return rate_control.controllers[urlparse(url).netloc]
+
+
+def test_503_burst_halves_limit_once(serve, monkeypatch):
+    monkeypatch.setattr(http_client, "MAX_RETRIES", 2)
+    url = serve(error_rate=1.0)
+
+    response = http_client.get(f"{url}/Fiches/carmat/1")
+
+    assert response.status_code == 503
+    controller = controller_of(url)
+    # Three 503 in a row within DECREASE_INTERVAL count as a single decrease
+    assert controller.decreases == 1
+    assert controller.limit == rate_control.INITIAL_CONCURRENCY * rate_control.DECREASE_FACTOR
+    assert controller.in_flight == 0
+
+
+def test_429_pauses_host_and_converges(serve, records):
+    url = serve(max_concurrency=1, latency=0.2)
+    identifiants = [record["Identifiant"] for record in records[:rate_control.INITIAL_CONCURRENCY]]
+    statuses = {}
+
+    def fetch(identifiant):
+        statuses[identifiant] = http_client.get(f"{url}/Fiches/carmat/{identifiant}").status_code
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=fetch, args=(identifiant,)) for identifiant in identifiants]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == dict.fromkeys(identifiants, 200)
+    controller = controller_of(url)
+    assert controller.decreases >= 1
+    assert controller.limit < rate_control.INITIAL_CONCURRENCY
+    # Retry-After: 1 held every request to the host for at least a second
+    assert controller.paused_until > start + 1
+    assert controller.in_flight == 0
+
+
+def test_network_error_decreases_limit(monkeypatch):
+    import requests
+
+    monkeypatch.setattr(http_client, "MAX_RETRIES", 1)
+    url = "http://127.0.0.1:9"  # Port fermé
+
+    with pytest.raises(requests.ConnectionError):
+        http_client.get(f"{url}/Fiches/carmat/1", timeout=1)
+
+    controller = controller_of(url)
+    assert controller.decreases == 1
+    assert controller.in_flight == 0
+
+
+def test_limit_grows_additively_when_saturated(monkeypatch):
+    monkeypatch.setattr(rate_control, "RECOVERY_DELAY", 0)
+    controller = rate_control.RateController("hôte")
+    for _ in range(rate_control.INITIAL_CONCURRENCY):
+        controller.acquire()
+
+    controller.release(0.1, 200)
+
+    assert controller.limit == pytest.approx(rate_control.INITIAL_CONCURRENCY + 1 / rate_control.INITIAL_CONCURRENCY)
+
+
+def test_limit_stable_when_not_saturated(monkeypatch):
+    monkeypatch.setattr(rate_control, "RECOVERY_DELAY", 0)
+    controller = rate_control.RateController("hôte")
+    controller.acquire()
+
+    controller.release(0.1, 200)
+
+    assert controller.limit == rate_control.INITIAL_CONCURRENCY
+
+
+def test_slow_response_counts_as_throttle():
+    controller = rate_control.RateController("hôte")
+    controller.acquire()
+
+    controller.release(rate_control.LATENCY_TARGET + 1, 200)
+
+    assert controller.decreases == 1
+    assert controller.limit == rate_control.INITIAL_CONCURRENCY * rate_control.DECREASE_FACTOR
+
+
+def test_limit_never_below_minimum():
+    controller = rate_control.RateController("hôte")
+    for _ in range(10):
+        controller.acquire()
+        controller._last_decrease = float("-inf")
+        controller.release(0.1, 503)
+
+    assert controller.limit == rate_control.MIN_CONCURRENCY
+
+
+def test_acquire_waits_for_retry_after():
+    controller = rate_control.RateController("hôte")
+    controller.acquire()
+    controller.release(0.1, 429, retry_after=0.3)
+
+    start = time.monotonic()
+    controller.acquire()
+
+    assert time.monotonic() - start >= 0.25
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2", 2.0),
+    ("-5", 0.0),
+    ("", None),
+    (None, None),
+    ("bientôt", None),
+])
+def test_parse_retry_after(value, expected):
+    assert rate_control.parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert rate_control.parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
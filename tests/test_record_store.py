@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from compact_records import CompactRecord
+from record_store import RecordStore
+
+RECORDS = [
+    {"Identifiant": "1", "Commune": "SAINT-MARTIN-D'HÈRES", "Site en activité": "Oui",
+     "Substances": "Sables, Graviers", "Produits": "Granulat alluvionnaire",
+     "Longitude": "5.76", "Latitude": "45.17", "Date de fin d'autorisation": "2031"},
+    {"Identifiant": "2", "Commune": "SAINT-ÉGRÈVE", "Site en activité": "Non",
+     "Substances": "Calcaire", "Produits": "Voirie, Granulat concassé",
+     "Longitude": "5.68", "Latitude": "45.23", "Date de fin d'autorisation": "2012"},
+    {"Identifiant": "3", "Commune": "ÉVIAN-LES-BAINS", "Site en activité": "Oui",
+     "Substances": "Argile", "Produits": None,
+     "Longitude": "6.59", "Latitude": "46.40", "Date de fin d'autorisation": None},
+    {"Identifiant": "4", "Commune": "LYON", "Site en activité": "Oui", "Substances": "Sables"},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordStore(str(tmp_path / "carrieres.sqlite"))
+    store.upsert(RECORDS)
+    yield store
+    store.close()
+
+
+def identifiants(records):
+    return [record["Identifiant"] for record in records]
+
+
+def test_upsert_replaces_record_words_and_position(store):
+    moved = dict(RECORDS[0], Substances="Gypse", Longitude="2.35", Latitude="48.85")
+
+    assert store.upsert([CompactRecord(moved)]) == 1
+
+    assert store.count() == 4
+    assert store.query(commune="saint-martin") == [moved]
+    # Old words and position are gone, the new ones are indexed
+    assert identifiants(store.query(substance="graviers")) == []
+    assert identifiants(store.query(substance="gypse")) == ["1"]
+    assert identifiants(store.query(bbox=(5.5, 45.0, 6.0, 45.5))) == ["2"]
+    assert identifiants(store.query(bbox=(2.0, 48.5, 2.5, 49.0))) == ["1"]
+    row_id = store._db.execute("SELECT id FROM carrieres WHERE identifiant = '1'").fetchone()[0]
+    assert store._db.execute("SELECT COUNT(*) FROM carrieres_mots WHERE id = ?", (row_id,)).fetchone()[0] == 3
+    assert store._db.execute("SELECT COUNT(*) FROM carrieres_position WHERE id = ?", (row_id,)).fetchone()[0] == 1
+
+
+def test_upsert_removes_position_without_coordinates(store):
+    store.upsert([{"Identifiant": "2", "Commune": "SAINT-ÉGRÈVE"}])
+
+    assert identifiants(store.query(bbox=(5.5, 45.0, 6.0, 45.5))) == ["1"]
+    assert identifiants(store.query(produit="voirie")) == []
+
+
+@pytest.mark.parametrize("criteria, expected", [
+    ({"commune": "saint"}, ["1", "2"]),
+    ({"commune": "SAINT-É"}, ["2"]),
+    ({"substance": "sable"}, ["1", "4"]),
+    ({"produit": "granulat"}, ["1", "2"]),
+    ({"produit": "granulat conc"}, ["2"]),
+    ({"active": True}, ["1", "3", "4"]),
+    ({"active": False}, ["2"]),
+    ({"authorised_until": 2020}, ["1"]),
+    ({"authorised_until": 2012}, ["1", "2"]),
+    ({"bbox": (5.0, 45.0, 7.0, 47.0)}, ["1", "2", "3"]),
+    ({"bbox": (6.0, 46.0, 7.0, 47.0)}, ["3"]),
+    ({"active": True, "bbox": (5.0, 45.0, 6.0, 46.0)}, ["1"]),
+    ({"substance": "sable", "active": True, "authorised_until": 2030}, ["1"]),
+    ({}, ["1", "2", "3", "4"]),
+])
+def test_query(store, criteria, expected):
+    assert identifiants(store.query(**criteria)) == expected
+
+
+def test_query_limit_and_like_wildcards(store):
+    assert identifiants(store.query(limit=2)) == ["1", "2"]
+    assert store.query(commune="%") == []
+    assert store.query(substance="_able") == []
+
+
+def test_import_file(tmp_path):
+    filename = str(tmp_path / "details_results_20241122_163223.ndjson")
+    with open(filename, "w", encoding="utf-8") as ndjson_file:
+        for record in RECORDS:
+            ndjson_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    store = RecordStore(str(tmp_path / "carrieres.sqlite"))
+
+    assert store.import_file(filename) == 4
+    assert store.import_file(filename) == 4
+
+    assert store.count() == 4
+    assert store.query(commune="ÉVIAN") == [RECORDS[2]]
+    store.close()
@@ -0,0 +1,97 @@
+import zlib
+
+import pytest
+
+import export_details_data
+from response_cache import ResponseCache
+
+
+def entry_size(body):
+    return len(zlib.compress(body.encode("utf-8")))
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "details_cache.sqlite")
+
+
+def test_fresh_then_expired(cache_path):
+    cache = ResponseCache(cache_path, ttl=60)
+    cache.store("http://fiche/1", "<html>é</html>", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    fresh = cache.lookup("http://fiche/1")
+    assert (fresh.body, fresh.fresh) == ("<html>é</html>", True)
+    assert cache.lookup("http://fiche/2") is None
+
+    cache.ttl = 0
+    expired = cache.lookup("http://fiche/1")
+    assert expired.fresh is False
+    assert ResponseCache.conditional_headers(expired) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert ResponseCache.conditional_headers(None) == {}
+    assert cache.stats["hits"] == 1
+
+    cache.revalidated("http://fiche/1")
+    cache.ttl = 60
+    assert cache.lookup("http://fiche/1").fresh
+    cache.close()
+
+
+def test_persistent(cache_path):
+    cache = ResponseCache(cache_path)
+    cache.store("http://fiche/1", "<html>1</html>", {})
+    cache.close()
+
+    reopened = ResponseCache(cache_path)
+    assert reopened.lookup("http://fiche/1").body == "<html>1</html>"
+    reopened.close()
+
+
+def test_lru_eviction(cache_path):
+    bodies = {f"http://fiche/{index}": f"<html>fiche {index}</html>" for index in range(4)}
+    cache = ResponseCache(cache_path, max_size=3 * max(entry_size(body) for body in bodies.values()))
+    for url in list(bodies)[:3]:
+        cache.store(url, bodies[url], {})
+    # fiche/0 is used again, so fiche/1 is now the least recently used
+    cache.lookup("http://fiche/0")
+
+    cache.store("http://fiche/3", bodies["http://fiche/3"], {})
+
+    assert cache.lookup("http://fiche/1") is None
+    assert [cache.lookup(f"http://fiche/{index}") is not None for index in (0, 2, 3)] == [True, True, True]
+    assert cache.stats["evictions"] == 1
+    cache.close()
+
+
+def test_size_limit_shared_between_processes(cache_path):
+    body = "<html>fiche</html>"
+    max_size = 4 * entry_size(body)
+    # Two --worker processes filling the same cache database
+    workers = [ResponseCache(cache_path, max_size=max_size) for _ in range(2)]
+    for index in range(10):
+        workers[index % 2].store(f"http://fiche/{index}", body, {})
+
+    total_size = workers[0]._db.execute("SELECT SUM(length(body)) FROM responses").fetchone()[0]
+    assert total_size <= max_size
+    for worker in workers:
+        worker.close()
+
+
+def test_revalidation_against_mock_server(serve, records, cache_path, monkeypatch):
+    url = serve()
+    cache = ResponseCache(cache_path, ttl=60)
+    monkeypatch.setattr(export_details_data, "MINERALINFO_URL", url)
+    monkeypatch.setattr(export_details_data, "details_cache", cache)
+    carmat_id = records[0]["Identifiant"]
+
+    body = export_details_data.fetch_additional_details(carmat_id)
+    assert export_details_data.fetch_additional_details(carmat_id) == body
+    assert (cache.stats["misses"], cache.stats["hits"]) == (1, 1)
+
+    # Expired: the mock server answers 304 to the stored ETag
+    cache.ttl = 0
+    assert export_details_data.fetch_additional_details(carmat_id) == body
+    assert cache.stats["revalidated"] == 1
+    assert cache.stats["misses"] == 1
+    cache.close()
@@ -0,0 +1,68 @@
+import itertools
+
+import pytest
+
+from session_pool import SESSION_RETRIES, SessionExpired, SessionPool, looks_expired
+
+
+def sessions():
+    counter = itertools.count(1)
+    return lambda: {"Cookie": f"JSESSIONID={next(counter)}"}
+
+
+def test_expired_session_is_rebuilt():
+    pool = SessionPool(sessions(), 1)
+    seen = []
+
+    def fetch(page_number, headers):
+        seen.append(headers["Cookie"])
+        if headers["Cookie"] == "JSESSIONID=1":
+            raise SessionExpired("redirection")
+        return f"page {page_number}"
+
+    assert pool.fetch(fetch, 7) == "page 7"
+    assert seen == ["JSESSIONID=1", "JSESSIONID=2"]
+    assert pool.rebuilds == 1
+    # The rebuilt session goes back to the pool
+    assert pool.fetch(fetch, 8) == "page 8"
+    assert seen[-1] == "JSESSIONID=2"
+
+
+def test_page_abandoned_after_retries():
+    pool = SessionPool(sessions(), 1)
+
+    def fetch(page_number, headers):
+        raise SessionExpired("page sans résultats")
+
+    assert pool.fetch(fetch, 1) is None
+    assert pool.rebuilds == SESSION_RETRIES
+
+
+def test_failed_rebuild_abandons_page():
+    create = sessions()
+    created = []
+
+    def create_session():
+        if created:
+            raise Exception("Erreur lors du lancement de la recherche: 503")
+        created.append(create())
+        return created[-1]
+
+    def fetch(page_number, headers):
+        raise SessionExpired("redirection")
+
+    pool = SessionPool(create_session, 1)
+
+    assert pool.fetch(fetch, 1) is None
+    assert pool.rebuilds == 0
+    # The pool still holds a session, so later pages try again
+    assert pool.fetch(lambda page_number, headers: headers, 2) == created[0]
+
+
+@pytest.mark.parametrize("html_content, expected", [
+    ('<span id="pagination_last"></span><tr class="results_item">', False),
+    ("<html><body></body></html>", True),
+    ('<span id="pagination_last"></span>', True),
+])
+def test_looks_expired(html_content, expected):
+    assert looks_expired(html_content) is expected
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from work_queue import Shard, WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_duration=0.4)
+    yield queue
+    queue.close()
+
+
+def test_create_is_idempotent(queue):
+    assert queue.create(1, 120, shard_pages=50) == 3
+    assert queue.create(1, 500, shard_pages=50) == 3
+    assert queue.shards() == [Shard(1, 1, 50), Shard(2, 51, 100), Shard(3, 101, 120)]
+    assert queue.output_for(queue.shards()[1]).endswith("queue_pages_000051_000100.ndjson")
+
+
+def test_claims_are_exclusive(queue):
+    queue.create(1, 100, shard_pages=50)
+
+    first = queue.claim("a")
+    second = queue.claim("b")
+
+    assert (first.id, second.id) == (1, 2)
+    assert queue.claim("c") is None
+    assert queue.remaining() == 2
+
+
+def test_expired_lease_is_taken_over(queue):
+    queue.create(1, 50, shard_pages=50)
+    shard = queue.claim("a")
+
+    time.sleep(0.5)
+    taken_over = queue.claim("b")
+
+    assert taken_over == shard
+    # The previous holder can neither renew nor complete the shard any more
+    assert not queue.renew(shard, "a")
+    assert not queue.complete(shard, "a")
+    assert queue.complete(taken_over, "b")
+    assert queue.remaining() == 0
+    assert queue.claim("c") is None
+
+
+def test_lease_is_renewed(queue):
+    queue.create(1, 50, shard_pages=50)
+    shard = queue.claim("a")
+
+    with queue.lease(shard, "a") as lost:
+        time.sleep(0.6)
+        assert queue.claim("b") is None
+    assert not lost.is_set()
+
+
+def test_lease_lost(queue):
+    queue.create(1, 50, shard_pages=50)
+    shard = queue.claim("a")
+    # Worker "a" renews too late (every second) for its 0.4 s lease, as after a long pause
+    stalled = WorkQueue(queue.path, lease_duration=4)
+
+    with stalled.lease(shard, "a") as lost:
+        time.sleep(0.6)
+        assert queue.claim("b") == shard
+        assert lost.wait(2)
+    stalled.close()
+
+
+def test_shared_between_connections(tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    coordinator = WorkQueue(path)
+    coordinator.create(1, 100, shard_pages=50)
+    worker = WorkQueue(path)
+
+    shard = worker.claim("a")
+    worker.complete(shard, "a")
+
+    assert coordinator.remaining() == 1
+    assert "1/2 terminés" in coordinator.format_progress()
+    coordinator.close()
+    worker.close()
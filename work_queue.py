@@ -0,0 +1,163 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Configuration
+SHARD_PAGES = 50  # Pages de résultats par shard
+LEASE_DURATION = 600  # Secondes : un shard non renouvelé pendant cette durée peut être repris
+LOCK_TIMEOUT = 60  # Secondes d'attente du verrou SQLite quand plusieurs workers y accèdent
+
+Shard = namedtuple("Shard", ["id", "first_page", "last_page"])
+
+
+class LeaseLost(Exception):
+    """
+    Le bail du shard a expiré et le shard a été repris par un autre worker.
+    """
+
+
+def worker_id():
+    """
+    Identifiant d'un worker, unique sur l'ensemble des machines partageant la file.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    File de travail partagée entre plusieurs processus ou machines, stockée dans une base SQLite
+    (sur un système de fichiers partagé pour plusieurs machines).
+
+    La plage de pages est découpée en shards. Un worker prend un shard avec un bail (lease)
+    qu'il renouvelle tant qu'il y travaille ; si le worker meurt, le bail expire et le shard
+    peut être pris par un autre worker. Les horloges des machines doivent être synchronisées.
+    """
+
+    def __init__(self, path, lease_duration=LEASE_DURATION):
+        self.path = path
+        self.lease_duration = lease_duration
+        # Autocommit: claims use explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(path, timeout=LOCK_TIMEOUT, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS shards ("
+            "id INTEGER PRIMARY KEY, first_page INTEGER NOT NULL, last_page INTEGER NOT NULL, "
+            "worker TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def create(self, first_page, last_page, shard_pages=SHARD_PAGES):
+        """
+        Découpe les pages first_page..last_page en shards, sauf si la file en contient déjà
+        (reprise d'un crawl distribué). Renvoie le nombre de shards de la file.
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if not self._db.execute("SELECT COUNT(*) FROM shards").fetchone()[0]:
+                self._db.executemany(
+                    "INSERT INTO shards (first_page, last_page) VALUES (?, ?)",
+                    [(page, min(page + shard_pages - 1, last_page))
+                     for page in range(first_page, last_page + 1, shard_pages)],
+                )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return self._db.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+
+    def claim(self, worker):
+        """
+        Prend le premier shard non terminé dont le bail est libre ou expiré, ou renvoie None.
+        """
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(
+                "SELECT id, first_page, last_page FROM shards "
+                "WHERE done = 0 AND (lease_until IS NULL OR lease_until < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE shards SET worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker, now + self.lease_duration, row[0]),
+                )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return Shard(*row) if row else None
+
+    def renew(self, shard, worker):
+        """
+        Prolonge le bail ; renvoie False si le shard a été repris par un autre worker.
+        """
+        cursor = self._db.execute(
+            "UPDATE shards SET lease_until = ? WHERE id = ? AND worker = ? AND done = 0",
+            (time.time() + self.lease_duration, shard.id, worker),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, shard, worker):
+        """
+        Marque le shard terminé ; renvoie False si le worker n'en détenait plus le bail.
+        """
+        cursor = self._db.execute(
+            "UPDATE shards SET done = 1, lease_until = NULL WHERE id = ? AND worker = ?",
+            (shard.id, worker),
+        )
+        return cursor.rowcount == 1
+
+    @contextmanager
+    def lease(self, shard, worker):
+        """
+        Renouvelle le bail du shard en arrière-plan tant que le bloc s'exécute. Renvoie un
+        threading.Event positionné si le bail est perdu : le worker doit alors cesser d'écrire
+        les fichiers du shard, que le nouveau détenteur reprend.
+        """
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def heartbeat():
+            queue = WorkQueue(self.path, self.lease_duration)  # SQLite connections stay in their thread
+            try:
+                while not stop.wait(self.lease_duration / 4):
+                    if not queue.renew(shard, worker):
+                        print(f"Bail du shard {shard.id} perdu : il a été repris par un autre worker.")
+                        lost.set()
+                        return
+            finally:
+                queue.close()
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
+
+    def shards(self):
+        return [Shard(*row) for row in self._db.execute("SELECT id, first_page, last_page FROM shards ORDER BY first_page")]
+
+    def remaining(self):
+        return self._db.execute("SELECT COUNT(*) FROM shards WHERE done = 0").fetchone()[0]
+
+    def output_for(self, shard):
+        """
+        Fichier NDJSON du shard, à côté de la base de la file.
+        """
+        base = os.path.splitext(self.path)[0]
+        return f"{base}_pages_{shard.first_page:06d}_{shard.last_page:06d}.ndjson"
+
+    def format_progress(self):
+        total, done, leased = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(done), 0), COALESCE(SUM(done = 0 AND lease_until >= ?), 0) FROM shards",
+            (time.time(),),
+        ).fetchone()
+        return f"Shards : {done}/{total} terminés, {leased} en cours."
+
+    def close(self):
+        self._db.close()